@@ -0,0 +1,37 @@
+"""Session fixtures for the pytest test modules in the repo root
+
+The Graphiti modules request warm_memory_pools (pytestmark) and so need a
+configured .env with Neo4j and OpenAI; the offline cache tests use neither.
+"""
+
+import pytest
+
+from src.config import validate_all_configs
+from src.event_loop import new_event_loop
+from src.graphiti_client import GraphitiMemoryClient
+
+
+def pytest_asyncio_loop_factories(config, item):
+    """Run async tests and fixtures on the loop main.py uses (uvloop where installed)"""
+    return {"new_event_loop": new_event_loop}
+
+
+@pytest.fixture(scope="session")
+def validated_config():
+    """Fail every test up front when required environment variables are missing"""
+    try:
+        validate_all_configs()
+    except ValueError as e:
+        pytest.fail(f"Configuration validation failed: {e}", pytrace=False)
+
+
+@pytest.fixture(scope="session")
+async def warm_memory_pools(validated_config):
+    """Hold a memory client open for the session
+
+    It opens the session loop's shared OpenAI and Neo4j pools and runs the
+    schema check before the first test, so that one-time cost is not counted
+    in any test's duration, and keeps the pools connected between tests.
+    """
+    async with GraphitiMemoryClient():
+        yield
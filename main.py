@@ -1,9 +1,11 @@
 """CLI interface for the Memory Agent with Graphiti and OpenAI"""
 
+import asyncio
 import sys
 import logging
 from src.config import validate_all_configs
 from src.agent import SyncMemoryAgent
+from src.event_loop import new_event_loop
 from src.user_session import UserSessionManager
 from src.visualizer import GraphVisualizer
 from src.logging_config import setup_logging, get_logger
@@ -67,8 +69,17 @@ def main():
         user_id = UserSessionManager.prompt_for_user()
         logger.info(f"User session started: {user_id}")
 
+        # One event loop for every agent this session, so agents created on a
+        # user switch reuse the shared OpenAI and Neo4j connection pools
+        loop = new_event_loop()
+        asyncio.set_event_loop(loop)
+
         # Initialize agent with user_id
-        agent = SyncMemoryAgent(user_id=user_id)
+        agent = SyncMemoryAgent(user_id=user_id, loop=loop)
+
+        # One visualizer for the session, on the same loop, so every visualize
+        # command reuses its Neo4j pool; it connects on first use
+        visualizer = GraphVisualizer()
         logger.info(f"Agent initialized for user: {user_id}")
 
         print_welcome(user_id)
@@ -93,9 +104,10 @@ def main():
 
                 if user_input.lower() == "switch":
                     print("\nSwitching user...")
-                    agent.close()
                     user_id = UserSessionManager.prompt_for_user()
-                    agent = SyncMemoryAgent(user_id=user_id)
+                    # Open the new agent before closing the old one so the pools stay warm
+                    previous, agent = agent, SyncMemoryAgent(user_id=user_id, loop=loop)
+                    previous.close()
                     logger.info(f"User switched to: {user_id}")
                     print(f"✓ Switched to user: {user_id}\n")
                     continue
@@ -136,9 +148,9 @@ def main():
                             print(f"✓ Deleted user '{target_user}' ({result['episodes_removed']} episodes removed).\n")
                             if target_user == user_id:
                                 print("You deleted your own data. Please switch to a new user.")
-                                agent.close()
                                 user_id = UserSessionManager.prompt_for_user()
-                                agent = SyncMemoryAgent(user_id=user_id)
+                                previous, agent = agent, SyncMemoryAgent(user_id=user_id, loop=loop)
+                                previous.close()
                                 print(f"✓ Switched to user: {user_id}\n")
                         else:
                             print(f"⚠️  {result['reason']}\n")
@@ -162,11 +174,11 @@ def main():
                                 print("⚠️  Invalid time range. Use: visualize 7, visualize 30, or visualize\n")
                                 continue
 
-                        # Create visualizer and show graph
+                        # Show graph with the session visualizer
                         print("\nGenerating graph visualization...")
-                        visualizer = GraphVisualizer()
-                        visualizer.visualize_user_graph(user_id, days_back=days_back)
-                        visualizer.close()
+                        loop.run_until_complete(
+                            visualizer.visualize_user_graph(user_id, days_back=days_back)
+                        )
                     except Exception as e:
                         logger.error(f"Error visualizing graph: {e}", exc_info=True)
                         print(f"Error: Could not visualize graph: {e}\n")
@@ -195,7 +207,9 @@ def main():
                 print("Error: Could not process message. Please try again.\n")
 
         # Clean up
+        loop.run_until_complete(visualizer.close())
         agent.close()
+        loop.close()
 
     except ValueError as e:
         logger.error(f"Configuration Error: {e}")
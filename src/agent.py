@@ -1,13 +1,14 @@
 """Main agent implementation with memory, web search, and OpenAI function calling"""
 
 import asyncio
-import json
 import logging
 from datetime import datetime
 from typing import Optional
 from openai import AsyncOpenAI, APIError, APIConnectionError
+import orjson
 
 from src.config import OpenAIConfig, AgentConfig
+from src.event_loop import new_event_loop
 from src.graphiti_client import GraphitiMemory
 from src.tools import ToolRegistry
 from src.logging_config import get_logger
@@ -25,29 +26,66 @@ _ERROR_PREFIXES = (
     "Error processing tool results:",
 )
 
+# OpenAI function calling schema. The tool set is fixed, so one list is shared
+# by every agent - treat it as read-only
+_TOOL_DEFINITIONS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "web_search",
+            "description": "Search the web for current information when you need up-to-date facts, news, prices, or information beyond your training data",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The search query to find relevant information on the web",
+                    }
+                },
+                "required": ["query"],
+            },
+        },
+    }
+]
+
 
 class MemoryAgent:
     """Agent with temporal knowledge graph memory and web search capabilities"""
 
-    def __init__(self, user_id: Optional[str] = None, loop=None):
-        """Initialize the agent with optional event loop"""
+    def __init__(
+        self,
+        user_id: Optional[str] = None,
+        loop=None,
+        llm_client: Optional[AsyncOpenAI] = None,
+    ):
+        """Initialize the agent with optional event loop
+
+        Args:
+            user_id: User whose memory the agent reads and writes
+            loop: Event loop the agent runs on (managed by SyncMemoryAgent)
+            llm_client: Chat completions client to use instead of building one
+                from OpenAIConfig, e.g. a mock in tests
+        """
         from src.graphiti_client import GraphitiMemoryClient
 
         self.config = OpenAIConfig()
         self.agent_config = AgentConfig()
 
         # Initialize OpenAI client
-        try:
-            # Build client kwargs - include base_url if using Azure endpoint
-            client_kwargs = {"api_key": self.config.api_key}
-            if self.config.api_endpoint:
-                client_kwargs["base_url"] = self.config.api_endpoint
+        if llm_client is not None:
+            self.llm_client = llm_client
+        else:
+            try:
+                # Build client kwargs - include base_url if using Azure endpoint
+                client_kwargs = {"api_key": self.config.api_key}
+                if self.config.api_endpoint:
+                    client_kwargs["base_url"] = self.config.api_endpoint
 
-            self.llm_client = AsyncOpenAI(**client_kwargs)
-            logger.info("OpenAI client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize OpenAI client: {e}", exc_info=True)
-            raise RuntimeError(f"Cannot initialize LLM client: {str(e)}")
+                self.llm_client = AsyncOpenAI(**client_kwargs)
+                logger.info("OpenAI client initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize OpenAI client: {e}", exc_info=True)
+                raise RuntimeError(f"Cannot initialize LLM client: {str(e)}")
 
         # Initialize async memory client (for use within async methods)
         self.memory_client = GraphitiMemoryClient()
@@ -71,6 +109,7 @@ class MemoryAgent:
 
         # User ID for tracking conversations
         self.user_id = user_id or "default_user"
+        self.memory_client.bind_user(self.user_id)
 
         # Conversation history for context window
         self.conversation_history: list[dict] = []
@@ -78,28 +117,8 @@ class MemoryAgent:
         logger.info(f"Agent initialized for user: {self.user_id}")
 
     def _get_tool_definitions(self) -> list:
-        """Get OpenAI function calling tool definitions (built once, reused)"""
-        if not hasattr(self, "_tool_definitions"):
-            self._tool_definitions = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "web_search",
-                        "description": "Search the web for current information when you need up-to-date facts, news, prices, or information beyond your training data",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string",
-                                    "description": "The search query to find relevant information on the web",
-                                }
-                            },
-                            "required": ["query"],
-                        },
-                    },
-                }
-            ]
-        return self._tool_definitions
+        """Get OpenAI function calling tool definitions (shared module constant)"""
+        return _TOOL_DEFINITIONS
 
     def _create_system_prompt(self) -> str:
         """Create the system prompt for the agent"""
@@ -204,7 +223,7 @@ You have access to the web_search function - use it intelligently when needed.""
     async def _execute_tool_call(self, tool_call) -> str:
         """Execute a single tool call and return the result"""
         tool_name = tool_call.function.name
-        tool_args = json.loads(tool_call.function.arguments)
+        tool_args = orjson.loads(tool_call.function.arguments)
 
         if tool_name == "web_search":
             query = tool_args.get("query", "")
@@ -404,14 +423,27 @@ You have access to the web_search function - use it intelligently when needed.""
 class SyncMemoryAgent:
     """Synchronous wrapper around MemoryAgent for CLI usage"""
 
-    def __init__(self, user_id: Optional[str] = None):
-        """Initialize the agent with shared event loop"""
-        import asyncio
+    def __init__(
+        self,
+        user_id: Optional[str] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        """Initialize the agent with shared event loop
 
+        Args:
+            user_id: User whose memory the agent reads and writes
+            loop: Existing (not running) event loop to reuse, e.g. one shared by
+                several agents. It is left open on close(). If None, the agent
+                creates - and owns - its own loop
+        """
         try:
-            # Create single event loop that will be shared with MemoryAgent
-            self._loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self._loop)
+            # Single event loop shared with MemoryAgent (uvloop when installed)
+            self._owns_loop = loop is None
+            if self._owns_loop:
+                self._loop = new_event_loop()
+                asyncio.set_event_loop(self._loop)
+            else:
+                self._loop = loop
 
             # Pass loop to async agent to avoid duplicate loop creation
             self._async_agent = MemoryAgent(user_id, loop=self._loop)
@@ -464,7 +496,7 @@ class SyncMemoryAgent:
             logger.warning(f"Error closing agent: {e}")
         finally:
             try:
-                if self._loop and not self._loop.is_closed():
+                if self._owns_loop and self._loop and not self._loop.is_closed():
                     self._loop.close()
                     logger.debug("Event loop closed successfully")
             except Exception as e:
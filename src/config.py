@@ -62,6 +62,20 @@ class AgentConfig:
     conversation_history_limit: int = int(os.getenv("CONVERSATION_HISTORY_LIMIT", "10"))
 
 
+class MemoryCacheConfig:
+    """Semantic memory-context cache configuration (opt-in)"""
+    enabled: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    similarity_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or "0.95")
+    ttl_seconds: int = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS") or "86400")
+
+
+class EmbeddingCacheConfig:
+    """Persistent query-embedding cache configuration (opt-in)"""
+    enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "false").lower() == "true"
+    ttl_seconds: int = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS") or "604800")
+    max_entries: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES") or "1000")
+
+
 def validate_all_configs() -> None:
     """Validate all required configurations"""
     OpenAIConfig.validate()
@@ -0,0 +1,152 @@
+"""Persistent per-user cache of memory-search query embeddings"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILE = Path.home() / ".agent_memory" / "query_embeddings.sqlite3"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS query_embeddings ("
+    "user_id TEXT NOT NULL, model TEXT NOT NULL, dim INTEGER NOT NULL, query TEXT NOT NULL, "
+    "vector BLOB NOT NULL, stored_at REAL NOT NULL, "
+    "PRIMARY KEY (user_id, model, dim, query))"
+)
+
+
+class QueryEmbeddingCache:
+    """Maps (user_id, model, dimensions, query text) to the query's embedding
+
+    Only memory-search queries are cached, scoped to the user who asked, so
+    purge_user() removes everything a deleted user left behind. Entries older
+    than ttl_seconds are ignored and dropped, and each user keeps at most
+    max_entries rows (oldest evicted). SQLite calls run in a worker thread so
+    a lock held by another process never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        dim: int,
+        path: Path = CACHE_FILE,
+        ttl_seconds: int = 604800,
+        max_entries: int = 1000,
+    ):
+        """Initialize the cache; the file is opened on first use
+
+        Args:
+            model: Embedding model id - part of the key, so a model change misses
+            dim: Vector length the embedder returns - also part of the key
+            path: SQLite file the vectors are persisted to
+            ttl_seconds: Entries older than this are ignored and dropped
+            max_entries: Per-user cap; the oldest entries are evicted first
+        """
+        self.model = model
+        self.dim = dim
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._db: Optional[sqlite3.Connection] = None
+        self._disabled = False
+        # Serializes the worker threads sharing the connection
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the cache file, or disable the cache if that fails"""
+        if self._db is None and not self._disabled:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Several processes (pytest-xdist workers) may share the file
+                self._db = sqlite3.connect(
+                    self.path, timeout=5, isolation_level=None, check_same_thread=False
+                )
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(_SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Could not open query embedding cache, embedding uncached: {e}")
+                self._disabled = True
+                self._db = None
+        return self._db
+
+    def _lookup_sync(self, user_id: str, query: str) -> Optional[list[float]]:
+        """Blocking lookup; run via lookup()"""
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None
+            try:
+                row = db.execute(
+                    "SELECT vector FROM query_embeddings WHERE user_id = ? AND model = ? "
+                    "AND dim = ? AND query = ? AND stored_at >= ?",
+                    (user_id, self.model, self.dim, query, time.time() - self.ttl_seconds),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Query embedding cache read failed: {e}")
+                return None
+        return None if row is None else np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def _store_sync(self, user_id: str, query: str, vector: list[float]) -> None:
+        """Blocking store plus eviction; run via store()"""
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            now = time.time()
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings "
+                    "(user_id, model, dim, query, vector, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, self.model, self.dim, query,
+                     np.asarray(vector, dtype=np.float32).tobytes(), now),
+                )
+                db.execute(
+                    "DELETE FROM query_embeddings WHERE stored_at < ?",
+                    (now - self.ttl_seconds,),
+                )
+                db.execute(
+                    "DELETE FROM query_embeddings WHERE user_id = ? AND rowid NOT IN ("
+                    "SELECT rowid FROM query_embeddings WHERE user_id = ? "
+                    "ORDER BY stored_at DESC LIMIT ?)",
+                    (user_id, user_id, self.max_entries),
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Query embedding cache write failed: {e}")
+
+    def _purge_user_sync(self, user_id: str) -> None:
+        """Blocking purge; run via purge_user()"""
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute("DELETE FROM query_embeddings WHERE user_id = ?", (user_id,))
+            except sqlite3.Error as e:
+                logger.warning(f"Query embedding cache purge failed: {e}")
+
+    async def lookup(self, user_id: str, query: str) -> Optional[list[float]]:
+        """Return the cached embedding for this user's query, or None on a miss"""
+        return await asyncio.to_thread(self._lookup_sync, user_id, query)
+
+    async def store(self, user_id: str, query: str, vector: list[float]) -> None:
+        """Cache a query embedding, evicting expired and over-cap entries"""
+        await asyncio.to_thread(self._store_sync, user_id, query, vector)
+
+    async def purge_user(self, user_id: str) -> None:
+        """Drop every cached query of a user, e.g. after their data is deleted"""
+        await asyncio.to_thread(self._purge_user_sync, user_id)
+
+    def close(self) -> None:
+        """Close the cache file"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,16 @@
+"""Event loop construction, backed by uvloop where it is installed"""
+
+import asyncio
+
+try:
+    import uvloop
+except ImportError:  # uvloop has no Windows build
+    uvloop = None
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create an event loop: uvloop's libuv loop if available, else asyncio's default"""
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
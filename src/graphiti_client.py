@@ -4,19 +4,50 @@ import logging
 from datetime import datetime
 from typing import Optional, Any
 import asyncio
+from dataclasses import dataclass
 from enum import Enum
+from itertools import accumulate, takewhile, tee
 
 from openai import AsyncOpenAI
 from graphiti_core import Graphiti
 from graphiti_core.llm_client import LLMConfig, OpenAIClient
+from graphiti_core.nodes import EpisodeType as GraphitiEpisodeType
 from graphiti_core.embedder.openai import OpenAIEmbedder, OpenAIEmbedderConfig
 from graphiti_core.cross_encoder.openai_reranker_client import OpenAIRerankerClient
-
-from src.config import OpenAIConfig, Neo4jConfig
+from graphiti_core.driver.neo4j_driver import Neo4jDriver
+from graphiti_core.search.search import search as graphiti_search
+from graphiti_core.search.search_config_recipes import EDGE_HYBRID_SEARCH_RRF
+from graphiti_core.search.search_filters import SearchFilters
+from graphiti_core.utils.bulk_utils import RawEpisode
+
+from src.config import OpenAIConfig, Neo4jConfig, MemoryCacheConfig, EmbeddingCacheConfig
+from src.embedding_cache import QueryEmbeddingCache
+from src.event_loop import new_event_loop
 from src.logging_config import get_logger
+from src.query_cache import SemanticQueryCache, shared_cache
 
 logger = get_logger(__name__)
 
+# Upper bound on the formatted memory context returned by get_context_for_query
+_MAX_CONTEXT_CHARS = 8192
+
+
+@dataclass
+class _SharedPools:
+    """Connection pools shared by every GraphitiMemoryClient on one event loop"""
+    llm_client: AsyncOpenAI
+    embedder_client: AsyncOpenAI
+    graph_driver: Neo4jDriver
+    # Clients currently holding the pools; the last close() closes them
+    users: int = 0
+    # Set once build_indices_and_constraints() has succeeded on this driver
+    schema_ready: bool = False
+
+
+# Event loop -> pools. httpx and Neo4j connections can't cross event loops, so
+# clients share pools only with clients on the same loop
+_POOLS: dict[asyncio.AbstractEventLoop, _SharedPools] = {}
+
 
 # Graphiti EpisodeType enum
 class EpisodeType(str, Enum):
@@ -26,6 +57,35 @@ class EpisodeType(str, Enum):
     md = "md"
 
 
+# Source strings that map to a non-default EpisodeType; anything else is text
+_EPISODE_TYPES = {
+    "json": EpisodeType.json,
+    "md": EpisodeType.md,
+    "markdown": EpisodeType.md,
+}
+
+
+@dataclass
+class EpisodeSpec:
+    """One episode for GraphitiMemoryClient.add_episodes_bulk (same defaults as add_episode)"""
+    name: str
+    episode_body: str
+    source: str = "text"
+    source_description: Optional[str] = None
+    reference_time: Optional[datetime] = None
+
+
+def _format_line(result: Any) -> Optional[str]:
+    """Format a single search result as a context bullet, or None if it has no text"""
+    if isinstance(result, dict):
+        # Extract text from result - could be in different formats
+        get = result.get
+        text = get("content") or get("text") or get("name") or str(result)
+    else:
+        text = str(result)
+    return f"- {text}" if text else None
+
+
 class GraphitiMemoryClient:
     """Wrapper around Graphiti for managing temporal knowledge graph memory"""
 
@@ -35,26 +95,34 @@ class GraphitiMemoryClient:
         self.neo4j_config = Neo4jConfig()
         self._graphiti: Optional[Graphiti] = None
         self._llm_client: Optional[OpenAIClient] = None
+        # Raw AsyncOpenAI clients (LLM + embeddings) and Neo4j driver, shared
+        # with the other clients on this event loop
+        self._pools: Optional[_SharedPools] = None
+        # Semantic context cache, created at initialize() when enabled
+        self._cache: Optional[SemanticQueryCache] = None
+        # Persistent per-user query-embedding cache, created at initialize() when enabled
+        self._embedding_cache: Optional[QueryEmbeddingCache] = None
+        # Cached per-session defaults so the hot path doesn't rebuild them per call
+        self._group_ids: Optional[list[str]] = None
+        self._default_source = EpisodeType.text
+
+    def bind_user(self, user_id: str) -> None:
+        """Bind a user session so searches and writes default to its group_id"""
+        self._group_ids = [user_id]
 
     async def initialize(self) -> None:
         """Initialize Graphiti and OpenAI clients"""
-        # Build client kwargs for LLM - include base_url if using Azure endpoint
-        llm_client_kwargs = {"api_key": self.config.api_key}
-        if self.config.api_endpoint:
-            llm_client_kwargs["base_url"] = self.config.api_endpoint
-
-        # Build client kwargs for embeddings - support separate resource
-        embedder_client_kwargs = {
-            "api_key": self.config.embedding_api_key or self.config.api_key
-        }
-        if self.config.embedding_endpoint:
-            embedder_client_kwargs["base_url"] = self.config.embedding_endpoint
-
-        # Create OpenAI async client for LLM
-        llm_client = AsyncOpenAI(**llm_client_kwargs)
+        cache_config = MemoryCacheConfig()
+        if cache_config.enabled:
+            self._cache = shared_cache(
+                threshold=cache_config.similarity_threshold,
+                ttl_seconds=cache_config.ttl_seconds,
+            )
 
-        # Create OpenAI async client for embeddings (may use different resource)
-        embedder_client = AsyncOpenAI(**embedder_client_kwargs)
+        if self._pools is None:
+            self._pools = self._acquire_pools()
+        pools = self._pools
+        llm_client, embedder_client = pools.llm_client, pools.embedder_client
 
         # Use a dedicated model for Graphiti's internal LLM calls if configured.
         # This matters when the main chat model is a reasoning/o-series model (e.g. gpt-5-mini-nlq)
@@ -80,6 +148,14 @@ class GraphitiMemoryClient:
                 embedding_model=self.config.embedding_model,
             ),
         )
+        embedding_cache_config = EmbeddingCacheConfig()
+        if embedding_cache_config.enabled and self._embedding_cache is None:
+            self._embedding_cache = QueryEmbeddingCache(
+                model=self.config.embedding_model,
+                dim=embedder.config.embedding_dim,
+                ttl_seconds=embedding_cache_config.ttl_seconds,
+                max_entries=embedding_cache_config.max_entries,
+            )
 
         # Initialize cross_encoder (reranker) for OpenAI
         cross_encoder = OpenAIRerankerClient(
@@ -89,9 +165,7 @@ class GraphitiMemoryClient:
 
         # Initialize Graphiti with OpenAI for all components
         self._graphiti = Graphiti(
-            uri=self.neo4j_config.uri,
-            user=self.neo4j_config.user,
-            password=self.neo4j_config.password,
+            graph_driver=pools.graph_driver,
             llm_client=self._llm_client,
             embedder=embedder,
             cross_encoder=cross_encoder,
@@ -100,16 +174,76 @@ class GraphitiMemoryClient:
         # Ensure Neo4j schema (indices + constraints) is fully ready before returning.
         # Graphiti's Neo4jDriver.__init__ schedules this as a background task, so calling
         # it here may overlap — suppress "already exists" errors from prior runs or the
-        # concurrent background task finishing first.
+        # concurrent background task finishing first. A shared driver only needs it once.
+        if pools.schema_ready:
+            return
         try:
             await self._graphiti.build_indices_and_constraints()
+            pools.schema_ready = True
             logger.info("Graphiti indices and constraints ready")
         except Exception as e:
             if 'already exists' not in str(e).lower():
                 logger.warning(f"Index initialization warning: {e}")
             else:
+                pools.schema_ready = True
                 logger.info("Graphiti indices and constraints ready (schema already existed)")
 
+    def _acquire_pools(self) -> _SharedPools:
+        """Join the running loop's shared pools, creating them for the first client"""
+        loop = asyncio.get_running_loop()
+        pools = _POOLS.get(loop)
+        if pools is None:
+            # Build client kwargs for LLM - include base_url if using Azure endpoint
+            llm_client_kwargs = {"api_key": self.config.api_key}
+            if self.config.api_endpoint:
+                llm_client_kwargs["base_url"] = self.config.api_endpoint
+
+            # Build client kwargs for embeddings - support separate resource
+            embedder_client_kwargs = {
+                "api_key": self.config.embedding_api_key or self.config.api_key
+            }
+            if self.config.embedding_endpoint:
+                embedder_client_kwargs["base_url"] = self.config.embedding_endpoint
+
+            pools = _POOLS[loop] = _SharedPools(
+                # Create OpenAI async client for LLM
+                llm_client=AsyncOpenAI(**llm_client_kwargs),
+                # Create OpenAI async client for embeddings (may use different resource)
+                embedder_client=AsyncOpenAI(**embedder_client_kwargs),
+                graph_driver=Neo4jDriver(
+                    uri=self.neo4j_config.uri,
+                    user=self.neo4j_config.user,
+                    password=self.neo4j_config.password,
+                ),
+            )
+            logger.debug("Created shared OpenAI and Neo4j connection pools")
+        pools.users += 1
+        return pools
+
+    async def _release_pools(self) -> None:
+        """Leave the shared pools, closing them if this was the last client"""
+        pools, self._pools = self._pools, None
+        if pools is None:
+            return
+        pools.users -= 1
+        if pools.users:
+            return
+        for loop, entry in list(_POOLS.items()):
+            if entry is pools:
+                del _POOLS[loop]
+
+        # The Neo4j driver and both OpenAI httpx pools drain independently,
+        # so close them concurrently rather than one after another
+        results = await asyncio.gather(
+            pools.llm_client.close(),
+            pools.embedder_client.close(),
+            pools.graph_driver.close(),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Error closing Graphiti: {result}")
+
     async def add_episode(
         self,
         name: str,
@@ -129,49 +263,101 @@ class GraphitiMemoryClient:
         if source_description is None:
             source_description = f"Episode from {source}"
 
-        try:
-            # Convert source string to EpisodeType enum
-            # Valid values: "text", "json", "md" (markdown)
-            source_enum = EpisodeType.text  # Default to text for conversation episodes
-            if source.lower() == "json":
-                source_enum = EpisodeType.json
-            elif source.lower() == "md" or source.lower() == "markdown":
-                source_enum = EpisodeType.md
-
-            # Build kwargs for add_episode - include group_id for user isolation
-            kwargs = {
-                "name": name,
-                "episode_body": episode_body,
-                "source": source_enum,  # Use enum instead of string
-                "source_description": source_description,
-                "reference_time": reference_time,
-            }
-            if group_id:
-                kwargs["group_id"] = group_id
+        if not group_id and self._group_ids:
+            group_id = self._group_ids[0]
 
-            await self._graphiti.add_episode(**kwargs)
+        try:
+            # Valid values: "text", "json", "md" (markdown); anything else is text
+            source_enum = _EPISODE_TYPES.get(source.lower(), self._default_source)
+
+            # group_id scopes the episode to a single user's graph
+            await self._graphiti.add_episode(
+                name=name,
+                episode_body=episode_body,
+                source=source_enum,
+                source_description=source_description,
+                reference_time=reference_time,
+                group_id=group_id,
+            )
+            if self._cache is not None and group_id:
+                self._cache.invalidate(group_id)
         except Exception as e:
             logger.error(f"Error adding episode: {e}", exc_info=True)
             raise
 
+    async def add_episodes_bulk(
+        self,
+        episodes: list[EpisodeSpec],
+        group_id: Optional[str] = None,
+    ) -> None:
+        """Add several episodes for one user in a single Graphiti bulk ingest
+
+        Extraction and the Neo4j writes are batched across the episodes instead
+        of running once per add_episode() call.
+        """
+        if not self._graphiti:
+            raise RuntimeError("Graphiti not initialized. Call initialize() first.")
+
+        if not group_id and self._group_ids:
+            group_id = self._group_ids[0]
+
+        try:
+            now = datetime.now()
+            raw_episodes = []
+            for spec in episodes:
+                source_enum = _EPISODE_TYPES.get(spec.source.lower(), self._default_source)
+                raw_episodes.append(RawEpisode(
+                    name=spec.name,
+                    content=spec.episode_body,
+                    source_description=spec.source_description or f"Episode from {spec.source}",
+                    # RawEpisode validates against Graphiti's enum, which has no "md"
+                    source=GraphitiEpisodeType.__members__.get(source_enum.value, GraphitiEpisodeType.text),
+                    reference_time=spec.reference_time or now,
+                ))
+
+            await self._graphiti.add_episode_bulk(raw_episodes, group_id=group_id)
+            if self._cache is not None and group_id:
+                self._cache.invalidate(group_id)
+        except Exception as e:
+            logger.error(f"Error adding {len(episodes)} episodes in bulk: {e}", exc_info=True)
+            raise
+
     async def search(
         self,
         query: str,
         num_results: int = 5,
         user_id: Optional[str] = None,
+        query_vector: Optional[list[float]] = None,
     ) -> dict[str, Any]:
-        """Search the knowledge graph for relevant information"""
+        """Search the knowledge graph for relevant information
+
+        Pass query_vector when the query has already been embedded to skip
+        Graphiti's own embedding call.
+        """
         if not self._graphiti:
             raise RuntimeError("Graphiti not initialized. Call initialize() first.")
 
+        # Use group_ids parameter (plural - Graphiti uses group_ids for user isolation)
+        group_ids = [user_id] if user_id else self._group_ids  # Graphiti expects a list
         try:
-            # Use group_ids parameter (plural - Graphiti uses group_ids for user isolation)
-            results = await self._graphiti.search(
-                query=query,
-                num_results=num_results,
-                group_ids=[user_id] if user_id else None,  # Graphiti expects a list
+            if query_vector is None:
+                return await self._graphiti.search(
+                    query=query,
+                    num_results=num_results,
+                    group_ids=group_ids,
+                )
+
+            # Same recipe as Graphiti.search(), with the precomputed embedding
+            config = EDGE_HYBRID_SEARCH_RRF.model_copy(update={"limit": num_results})
+            results = await graphiti_search(
+                self._graphiti.clients,
+                query,
+                group_ids,
+                config,
+                SearchFilters(),
+                query_vector=query_vector,
             )
-            return results
+            return results.edges
         except Exception as e:
             logger.error(f"Error searching knowledge graph: {e}", exc_info=True)
             raise
@@ -205,6 +391,10 @@ class GraphitiMemoryClient:
                 return {"deleted": False, "reason": f"User '{user_id}' not found in knowledge graph"}
             episode_count = user_info["episode_count"]
             await clear_data(self._graphiti.driver, group_ids=[user_id])
+            if self._cache is not None:
+                self._cache.invalidate(user_id)
+            if self._embedding_cache is not None:
+                await self._embedding_cache.purge_user(user_id)
             logger.info(f"Deleted all knowledge graph data for user: {user_id}")
             return {"deleted": True, "episodes_removed": episode_count}
         except Exception as e:
@@ -219,41 +409,77 @@ class GraphitiMemoryClient:
     ) -> str:
         """Get formatted context string from knowledge graph for a query"""
         try:
+            cache = self._cache
+            cache_user = user_id or (self._group_ids[0] if self._group_ids else None)
+            query_vector = None
+            if cache is not None and cache_user and self._graphiti:
+                generation = cache.generation(cache_user)
+                cached = cache.lookup_exact(cache_user, num_results, query)
+                if cached is not None:
+                    return cached
+                query_vector = await self._embed_query(query, cache_user)
+                cached = cache.lookup(cache_user, num_results, query_vector)
+                if cached is not None:
+                    return cached
+            elif self._embedding_cache is not None and cache_user and self._graphiti:
+                query_vector = await self._embed_query(query, cache_user)
+
             search_results = await self.search(
                 query=query,
                 num_results=num_results,
                 user_id=user_id,
+                query_vector=query_vector,
             )
 
             # search_results is a list from Graphiti
             if not search_results:
-                return "No relevant memories found."
-
-            # Format search results into a context string
-            context_parts = ["Relevant memories:"]
-            for result in search_results:
-                if isinstance(result, dict):
-                    # Extract text from result - could be in different formats
-                    text = result.get('content') or result.get('text') or result.get('name') or str(result)
-                    context_parts.append(f"- {text}")
-                else:
-                    context_parts.append(f"- {result}")
+                context = "No relevant memories found."
+            else:
+                # Stream bullets straight into the join, stopping at the first line that
+                # starts past the context budget sent to the LLM, then clip the tail
+                lines, sized = tee(filter(None, map(_format_line, search_results)))
+                offsets = accumulate((len(line) + 1 for line in sized), initial=0)
+                body = "\n".join(
+                    line for line, _ in takewhile(
+                        lambda pair: pair[1] < _MAX_CONTEXT_CHARS, zip(lines, offsets)
+                    )
+                )[:_MAX_CONTEXT_CHARS]
+                context = f"Relevant memories:\n{body}" if body else "No relevant memories found."
 
-            return "\n".join(context_parts)
+            if cache is not None and query_vector is not None:
+                cache.store(cache_user, num_results, query_vector, context, generation, query)
+            return context
 
         except Exception as e:
             logger.error(f"Error getting context: {e}", exc_info=True)
             return "Error retrieving memories."
 
+    async def _embed_query(self, query: str, user_id: str) -> list[float]:
+        """Embed a search query, through the user's query-embedding cache when enabled"""
+        embedding_cache = self._embedding_cache
+        if embedding_cache is not None:
+            cached = await embedding_cache.lookup(user_id, query)
+            if cached is not None:
+                return cached
+        vector = await self._graphiti.embedder.create(input_data=[query.replace("\n", " ")])
+        if embedding_cache is not None:
+            await embedding_cache.store(user_id, query, vector)
+        return vector
+
     async def close(self) -> None:
         """Close Graphiti and clean up resources"""
-        if self._graphiti:
-            # Graphiti uses async context managers, but we'll try to close if available
-            try:
-                if hasattr(self._graphiti, "close"):
-                    await self._graphiti.close()
-            except Exception as e:
-                logger.warning(f"Error closing Graphiti: {e}")
+        if self._cache is not None:
+            self._cache.save()
+        if self._embedding_cache is not None:
+            self._embedding_cache.close()
+            self._embedding_cache = None
+
+        # Graphiti.close() would close the shared driver; release the pools instead
+        await self._release_pools()
+
+        # Drop references so the clients can be collected
+        self._graphiti = None
+        self._llm_client = None
 
     async def __aenter__(self):
         """Async context manager entry"""
@@ -277,8 +503,21 @@ class GraphitiMemory:
 
     def initialize(self) -> None:
         """Initialize the Graphiti client"""
+        # Blocking on a loop is impossible from inside one, whichever loop it is
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "GraphitiMemory blocks on its event loop; use GraphitiMemoryClient from async code"
+            )
+
+        # Only a loop passed to __init__ is shared - the thread's current loop
+        # is never adopted; otherwise the wrapper creates its own and closes it
+        # in close()
         if self._loop is None:
-            self._loop = asyncio.new_event_loop()
+            self._loop = new_event_loop()
             asyncio.set_event_loop(self._loop)
             self._owns_loop = True
 
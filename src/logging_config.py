@@ -1,10 +1,29 @@
 """Logging configuration for the agent system"""
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
+# Background listener that owns the file handler (one per process)
+_listener: Optional[QueueListener] = None
+
+
+def _stop_listener() -> None:
+    """Flush queued records to disk and stop the background listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
 
 def setup_logging(
     log_level: str = "INFO",
@@ -14,6 +33,10 @@ def setup_logging(
     """
     Set up logging configuration for the entire application
 
+    File output goes through a QueueHandler so the calling thread never blocks
+    on disk; a background QueueListener does the actual writes. Safe to call
+    more than once - the previous listener is flushed and replaced.
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Optional log file path. If None, only logs to console
@@ -33,6 +56,8 @@ def setup_logging(
 
     # Remove existing handlers to avoid duplicates
     logger.handlers.clear()
+    _stop_listener()
+    logger.propagate = False
 
     # Create formatter
     formatter = logging.Formatter(
@@ -46,13 +71,18 @@ def setup_logging(
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
 
-    # File handler (optional)
+    # File handler (optional) - written from the listener thread
     if log_file:
+        global _listener
         log_file_path = Path(log_dir) / log_file
         file_handler = logging.FileHandler(log_file_path)
         file_handler.setLevel(getattr(logging, log_level.upper()))
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
 
     return logger
 
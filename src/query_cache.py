@@ -0,0 +1,307 @@
+"""Semantic cache of memory context, keyed by query embedding and persisted across sessions"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import msgpack
+import numpy as np
+
+from src.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILE = Path.home() / ".agent_memory" / "sem_cache.msgpack"
+
+# Rows allocated for a new partition; matrices grow by doubling
+_INITIAL_ROWS = 16
+
+
+def _normalize(vec) -> np.ndarray:
+    """Return vec as a float32 unit vector so cosine similarity is a dot product"""
+    arr = np.asarray(vec, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    return arr / norm if norm else arr
+
+
+def _to_int8(vec: np.ndarray) -> tuple[bytes, float]:
+    """Quantize to int8 with a per-vector scale - a quarter of the float32 bytes on disk"""
+    vec = np.asarray(vec, dtype=np.float32)
+    peak = float(np.abs(vec).max()) if vec.size else 0.0
+    scale = peak / 127 if peak else 1.0
+    return np.clip(np.rint(vec / scale), -127, 127).astype(np.int8).tobytes(), scale
+
+
+def _from_int8(data: bytes, scale: float) -> np.ndarray:
+    """Dequantize int8 bytes back to a float32 unit vector"""
+    return _normalize(np.frombuffer(data, dtype=np.int8).astype(np.float32) * np.float32(scale))
+
+
+def _from_bf16(data: bytes) -> np.ndarray:
+    """Widen bfloat16 bytes (the previous on-disk format) back to a float32 vector"""
+    return (np.frombuffer(data, dtype=np.uint16).astype(np.uint32) << 16).view(np.float32)
+
+
+class _Partition:
+    """Cached queries for one (user_id, num_results) as a contiguous fp32 matrix
+
+    Rows are unit vectors in insertion order, so a probe is a single
+    matrix-vector product. Evicted rows are masked out and the matrix is
+    compacted once more than half of it is dead.
+    """
+
+    __slots__ = ("vectors", "stored_at", "valid", "contexts", "size", "live")
+
+    def __init__(self, dim: int):
+        self.vectors = np.empty((_INITIAL_ROWS, dim), dtype=np.float32)
+        self.stored_at = np.empty(_INITIAL_ROWS, dtype=np.float64)
+        self.valid = np.zeros(_INITIAL_ROWS, dtype=bool)
+        self.contexts: list[Optional[str]] = []
+        self.size = 0
+        self.live = 0
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def append(self, vec: np.ndarray, context: str, stored_at: float) -> None:
+        """Add a unit vector row, doubling capacity when full"""
+        if self.size == len(self.vectors):
+            self._resize(2 * len(self.vectors))
+        row = self.size
+        self.vectors[row] = vec
+        self.stored_at[row] = stored_at
+        self.valid[row] = True
+        self.contexts.append(context)
+        self.size += 1
+        self.live += 1
+
+    def probe(self, query: np.ndarray, cutoff: float) -> tuple[int, float]:
+        """Return (row, similarity) of the best live row fresher than cutoff"""
+        n = self.size
+        sims = self.vectors[:n] @ query
+        live = self.valid[:n] & (self.stored_at[:n] >= cutoff)
+        sims[~live] = -np.inf
+        row = int(sims.argmax())
+        return row, float(sims[row])
+
+    def evict_oldest(self, keep: int) -> None:
+        """Mask out the oldest live rows so at most keep remain, then maybe compact"""
+        excess = self.live - keep
+        if excess > 0:
+            rows = np.flatnonzero(self.valid[: self.size])[:excess]
+            self.valid[rows] = False
+            for row in rows:
+                self.contexts[row] = None
+            self.live -= excess
+        if self.live * 2 < self.size:
+            self._compact()
+
+    def rows(self):
+        """Yield (vector, context, stored_at) for every live row"""
+        for row in np.flatnonzero(self.valid[: self.size]):
+            yield self.vectors[row], self.contexts[row], float(self.stored_at[row])
+
+    def _compact(self) -> None:
+        """Drop masked rows, keeping insertion order"""
+        keep = np.flatnonzero(self.valid[: self.size])
+        n = len(keep)
+        self.vectors[:n] = self.vectors[keep]
+        self.stored_at[:n] = self.stored_at[keep]
+        self.valid[:n] = True
+        self.valid[n:] = False
+        self.contexts = [self.contexts[row] for row in keep]
+        self.size = self.live = n
+
+    def _resize(self, capacity: int) -> None:
+        """Reallocate the backing arrays to hold capacity rows"""
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[: self.size] = self.vectors[: self.size]
+        stored_at = np.empty(capacity, dtype=np.float64)
+        stored_at[: self.size] = self.stored_at[: self.size]
+        valid = np.zeros(capacity, dtype=bool)
+        valid[: self.size] = self.valid[: self.size]
+        self.vectors, self.stored_at, self.valid = vectors, stored_at, valid
+
+
+class SemanticQueryCache:
+    """Per-user cache mapping query embeddings to formatted memory context
+
+    A lookup hits when a cached query for the same user and result count has
+    cosine similarity >= threshold and is younger than ttl_seconds. Repeats of
+    the exact query text are served by lookup_exact() before the query is
+    embedded. Writes to a user's graph must call invalidate() so stale context
+    is never served.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_FILE,
+        threshold: float = 0.95,
+        ttl_seconds: int = 86400,
+        max_entries: int = 256,
+    ):
+        """Initialize an empty cache; call load() to warm it from disk
+
+        Args:
+            path: msgpack file the cache is persisted to
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Entries older than this are ignored and dropped on load
+            max_entries: Per-partition cap; the oldest entries are evicted first
+        """
+        self.path = Path(path)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (user_id, num_results) -> query matrix for that partition
+        self._partitions: dict[tuple[str, int], _Partition] = {}
+        # (user_id, num_results) -> {query text: (context, stored_at)}, oldest
+        # first; in memory only
+        self._exact: dict[tuple[str, int], dict[str, tuple[str, float]]] = {}
+        # Bumped on invalidate() so in-flight lookups don't store stale context
+        self._generations: dict[str, int] = {}
+
+    def generation(self, user_id: str) -> int:
+        """Current write generation for a user; pass it back to store()"""
+        return self._generations.get(user_id, 0)
+
+    def lookup_exact(self, user_id: str, num_results: int, query: str) -> Optional[str]:
+        """Return cached context for this exact query text, or None - needs no embedding"""
+        entry = self._exact.get((user_id, num_results), {}).get(query)
+        if entry is None or entry[1] < time.time() - self.ttl_seconds:
+            return None
+        logger.debug(f"Exact query cache hit for user {user_id}")
+        return entry[0]
+
+    def lookup(self, user_id: str, num_results: int, query_vector) -> Optional[str]:
+        """Return cached context for the closest matching query, or None on a miss"""
+        partition = self._partitions.get((user_id, num_results))
+        if partition is None or partition.live == 0:
+            return None
+
+        query = _normalize(query_vector)
+        if query.shape[0] != partition.dim:
+            return None
+
+        row, sim = partition.probe(query, time.time() - self.ttl_seconds)
+        best_context = partition.contexts[row] if sim >= self.threshold else None
+
+        if best_context is not None:
+            logger.debug(f"Semantic cache hit for user {user_id} (similarity={sim:.3f})")
+        return best_context
+
+    def store(
+        self,
+        user_id: str,
+        num_results: int,
+        query_vector,
+        context: str,
+        generation: int,
+        query: Optional[str] = None,
+    ) -> None:
+        """Cache context for a query unless the user's graph changed since lookup
+
+        Pass the query text to also serve exact repeats through lookup_exact().
+        """
+        if generation != self.generation(user_id):
+            return
+
+        now = time.time()
+        self._append((user_id, num_results), _normalize(query_vector), context, now)
+        if query is not None:
+            exact = self._exact.setdefault((user_id, num_results), {})
+            exact.pop(query, None)
+            exact[query] = (context, now)
+            if len(exact) > self.max_entries:
+                del exact[next(iter(exact))]
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop every cached entry for a user after their graph changes"""
+        for key in [k for k in self._partitions if k[0] == user_id]:
+            del self._partitions[key]
+        for key in [k for k in self._exact if k[0] == user_id]:
+            del self._exact[key]
+        self._generations[user_id] = self.generation(user_id) + 1
+
+    def _append(self, key: tuple[str, int], vec: np.ndarray, context: str, stored_at: float) -> None:
+        """Add a row to a partition, starting a fresh one if the embedding size changed"""
+        partition = self._partitions.get(key)
+        if partition is None or partition.dim != vec.shape[0]:
+            partition = self._partitions[key] = _Partition(vec.shape[0])
+        partition.append(vec, context, stored_at)
+        if partition.live > self.max_entries:
+            partition.evict_oldest(self.max_entries)
+
+    def load(self) -> None:
+        """Warm the cache from disk, skipping entries older than the TTL"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "rb") as f:
+                partitions = msgpack.unpackb(f.read(), raw=False)
+
+            cutoff = time.time() - self.ttl_seconds
+            loaded = 0
+            for user_id, num_results, rows in partitions:
+                for row in rows:
+                    # [int8 bytes, scale, context, stored_at]; files written
+                    # before int8 have [bf16 bytes, context, stored_at]
+                    if len(row) == 4:
+                        vec_bytes, scale, context, stored_at = row
+                        vec = _from_int8(vec_bytes, scale) if stored_at >= cutoff else None
+                    else:
+                        vec_bytes, context, stored_at = row
+                        vec = _from_bf16(vec_bytes) if stored_at >= cutoff else None
+                    if vec is not None:
+                        self._append((user_id, num_results), vec, context, stored_at)
+                        loaded += 1
+            logger.info(f"Loaded {loaded} semantic cache entries from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load semantic cache, starting cold: {e}")
+            self._partitions.clear()
+
+    def save(self) -> None:
+        """Persist the cache with int8 vectors via fsync + atomic rename"""
+        partitions = [
+            [user_id, num_results, [[*_to_int8(vec), context, stored_at] for vec, context, stored_at in partition.rows()]]
+            for (user_id, num_results), partition in self._partitions.items()
+        ]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".sem_cache.")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(msgpack.packb(partitions, use_bin_type=True))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            logger.debug(f"Semantic cache saved to {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not save semantic cache: {e}")
+
+
+# One cache per process, shared by every GraphitiMemoryClient. Separate
+# instances would each save() their own load-time snapshot, so a later save
+# could resurrect entries another instance had invalidated
+_SHARED_CACHE: Optional[SemanticQueryCache] = None
+_SHARED_CACHE_LOCK = threading.Lock()
+
+
+def shared_cache(threshold: float = 0.95, ttl_seconds: int = 86400) -> SemanticQueryCache:
+    """Return the process-wide cache, creating and loading it on first use
+
+    The settings only apply when the cache is created; they come from
+    MemoryCacheConfig and are fixed for the process.
+    """
+    global _SHARED_CACHE
+    with _SHARED_CACHE_LOCK:
+        if _SHARED_CACHE is None:
+            _SHARED_CACHE = SemanticQueryCache(threshold=threshold, ttl_seconds=ttl_seconds)
+            _SHARED_CACHE.load()
+        return _SHARED_CACHE
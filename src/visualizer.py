@@ -1,21 +1,478 @@
 """Graph visualization for per-user knowledge graphs in Neo4j"""
 
+import asyncio
+import gzip
+import hashlib
+import heapq
+import math
+import shutil
+import threading
 import webbrowser
 import tempfile
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from string import Template
+from urllib.parse import quote, unquote, urlsplit
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timedelta
 
-from neo4j import GraphDatabase
+import networkx as nx
+import orjson
+from neo4j import AsyncGraphDatabase, AsyncDriver, AsyncManagedTransaction, AsyncSession
 from src.config import Neo4jConfig
 from src.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Write buffer for the rendered page - large enough that a typical graph is
+# flushed in one write
+_WRITE_BUFFER_SIZE = 8 << 20
+
+@dataclass
+class _SharedDriver:
+    """Async driver shared by every GraphVisualizer with the same URI and credentials"""
+    driver: AsyncDriver
+    # Visualizers currently holding the driver; the last close() closes it
+    users: int = 0
+
+
+# (uri, user, password hash) -> shared driver, so the Bolt pool is reused across
+# visualizers. The password is part of the key so a visualizer configured with
+# other credentials never borrows a connection authenticated as someone else.
+# A driver is bound to the event loop that first uses it - its holders must run
+# on that loop and close() before it shuts down.
+_DRIVERS: Dict[tuple[str, str, str], _SharedDriver] = {}
+
+# The visualizer's queries hint one of these indexes (see _episode_match) and
+# fail if it is missing. Graphiti creates episode_group_id under the same name
+# and definition, so that statement is a no-op on a database Graphiti has set
+# up; the (group_id, valid_at) index serves the days_back-windowed queries.
+# Entity(uuid) is already indexed by Graphiti (entity_uuid).
+_INDEX_STATEMENTS = (
+    "CREATE INDEX episode_group_id IF NOT EXISTS FOR (n:Episodic) ON (n.group_id)",
+    "CREATE INDEX episodic_group_time IF NOT EXISTS FOR (n:Episodic) ON (n.group_id, n.valid_at)",
+)
+
+# Rendered HTML per (user_id, days_back, output_file, compress, served) -> (path, latest valid_at, episode count).
+# A cached file is reused while the user's episodes in the window are unchanged.
+_HTML_CACHE: Dict[tuple, tuple[str, Any, int]] = {}
+
+# Node styling by node type (episode, or the entity's first label)
+_COLORS = {
+    "episode": "#667eea",
+    "Entity": "#764ba2",
+    "Person": "#f093fb",
+    "Organization": "#4facfe",
+    "Location": "#43e97b",
+    "Event": "#fa709a"
+}
+
+_SHAPES = {
+    "episode": "box",
+    "Entity": "dot",
+    "Person": "diamond",
+    "Organization": "ellipse",
+    "Location": "triangle"
+}
+
+
+
+@dataclass(slots=True)
+class NodeRec:
+    """A graph node as rendered, with color and shape resolved at fetch time"""
+    id: int
+    label: str
+    title: str
+    type: str
+    color: str
+    shape: str
+    # Fixed position, set only when the layout is computed offline
+    x: Optional[float] = None
+    y: Optional[float] = None
+
+
+# Page template, split so the graph data can be streamed into the file between
+# the pieces. Parameterized pieces are string.Templates with $placeholders, so
+# CSS percentages and JS braces stay literal.
+_HTML_HEAD = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Knowledge Graph - $user_id</title>
+$renderer_scripts
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            margin: 0;
+            padding: 0;
+        }
+        #header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 20px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        #header h1 {
+            margin: 0;
+            font-size: 24px;
+        }
+        #stats {
+            font-size: 14px;
+            margin-top: 10px;
+            opacity: 0.9;
+        }
+        #network {
+            width: 100%;
+            height: calc(100vh - 150px);
+            border: 1px solid #ddd;
+        }
+        #footer {
+            background: #f5f5f5;
+            padding: 10px 20px;
+            font-size: 12px;
+            color: #666;
+            border-top: 1px solid #ddd;
+        }
+        .legend {
+            display: flex;
+            gap: 20px;
+            margin-top: 10px;
+            flex-wrap: wrap;
+        }
+        .legend-item {
+            display: flex;
+            align-items: center;
+            gap: 8px;
+            font-size: 13px;
+        }
+        .legend-circle {
+            width: 16px;
+            height: 16px;
+            border-radius: 50%;
+        }
+    </style>
+</head>
+<body>
+    <div id="header">
+        <h1>📊 Knowledge Graph Visualization</h1>
+        <div id="stats">
+            <strong>User:</strong> $user_id |
+            <strong>Time Range:</strong> $time_range |
+            <strong>Episodes:</strong> $episode_count |
+            <strong>Entities:</strong> $entity_count |
+            <strong>Relationships:</strong> $edge_count
+        </div>
+        <div class="legend">
+            <div class="legend-item">
+                <div class="legend-circle" style="background-color: #667eea;"></div>
+                <span>Episodes</span>
+            </div>
+            <div class="legend-item">
+                <div class="legend-circle" style="background-color: #764ba2;"></div>
+                <span>Entities</span>
+            </div>
+        </div>
+    </div>
+
+    <div id="network"></div>
+
+    <div id="footer">
+        Generated on $generated |
+        Drag to pan, scroll to zoom, click nodes for details
+    </div>
+
+    <script type="text/javascript">
+""")
+
+_VIS_SCRIPTS = """    <script type="text/javascript" src="https://unpkg.com/vis-network/standalone/umd/vis-network.min.js"></script>"""
+
+# render(data) takes {nodes, edges, deferred} - passed inline, or fetched when
+# the page is served over HTTP
+_VIS_RENDER = Template("""        // Nodes arrive as [id, label, title, color, shape(, x, y)] rows
+        function toVisNode(row) {
+            var node = {id: row[0], label: row[1], title: row[2], color: row[3], shape: row[4]};
+            if (row.length > 5) {
+                node.x = row[5];
+                node.y = row[6];
+            }
+            return node;
+        }
+
+        function render(graphData) {
+            var nodes = new vis.DataSet(graphData.nodes.map(toVisNode));
+            var edges = new vis.DataSet(graphData.edges);
+            // Entities held back from the initial render, keyed by episode id
+            var deferred = graphData.deferred;
+
+            var data = {
+                nodes: nodes,
+                edges: edges
+            };
+
+            var options = {
+                physics: {
+                    enabled: $physics,
+                    stabilization: {
+                        iterations: 200
+                    },
+                    forceAtlas2Based: {
+                        gravitationalConstant: -26,
+                        centralGravity: 0.005,
+                        springLength: 200,
+                        springConstant: 0.08
+                    },
+                    maxVelocity: 50,
+                    timestep: 0.35,
+                    solver: 'forceAtlas2Based'
+                },
+                interaction: {
+                    navigationButtons: true,
+                    keyboard: true,
+                    zoomView: true,
+                    dragView: true
+                },
+                nodes: {
+                    font: {
+                        size: 14
+                    }
+                },
+                edges: {
+                    arrows: 'to',
+                    smooth: {
+                        type: 'continuous'
+                    },
+                    color: {
+                        color: '#999999',
+                        highlight: '#ff6b6b'
+                    }
+                }
+            };
+
+            var container = document.getElementById('network');
+            var network = new vis.Network(container, data, options);
+
+            network.on('click', function(params) {
+                if (params.nodes.length > 0) {
+                    var nodeId = params.nodes[0];
+                    var node = nodes.get(nodeId);
+                    console.log('Selected node:', node);
+
+                    // Reveal the lower-degree entities held back for this episode
+                    var hidden = deferred[nodeId];
+                    if (hidden) {
+                        delete deferred[nodeId];
+                        var origin = network.getPosition(nodeId);
+                        nodes.update(hidden.nodes.map(toVisNode).filter(function(n) {
+                            return nodes.get(n.id) === null;
+                        }).map(function(n) {
+                            // Without an offline layout, scatter around the episode
+                            if (n.x === undefined) {
+                                n.x = origin.x + (Math.random() - 0.5) * 200;
+                                n.y = origin.y + (Math.random() - 0.5) * 200;
+                            }
+                            return n;
+                        }));
+                        edges.add(hidden.edges);
+                        nodes.update({id: nodeId, label: hidden.label});
+                    }
+                }
+            });
+        }
+""")
+
+
+# WebGL renderer for graphs too large for vis.js canvas drawing. Nodes arrive
+# with fixed positions and graphology's {key, attributes} serialization.
+_SIGMA_SCRIPTS = """    <script type="text/javascript" src="https://unpkg.com/graphology@0.25.4/dist/graphology.umd.min.js"></script>
+    <script type="text/javascript" src="https://unpkg.com/sigma@2.4.0/build/sigma.min.js"></script>"""
+
+_SIGMA_RENDER = """        function render(graphData) {
+            var graph = new graphology.Graph({multi: true});
+            graph.import({nodes: graphData.nodes, edges: graphData.edges});
+            // Entities held back from the initial render, keyed by episode id
+            var deferred = graphData.deferred;
+
+            var container = document.getElementById('network');
+            var renderer = new Sigma(graph, container);
+
+            renderer.on('clickNode', function(event) {
+                var nodeId = event.node;
+                console.log('Selected node:', graph.getNodeAttributes(nodeId));
+
+                // Reveal the lower-degree entities held back for this episode
+                var hidden = deferred[nodeId];
+                if (hidden) {
+                    delete deferred[nodeId];
+                    // Deferred entities carry their offline-layout positions
+                    hidden.nodes.forEach(function(n) {
+                        if (!graph.hasNode(n.key)) {
+                            graph.addNode(n.key, n.attributes);
+                        }
+                    });
+                    hidden.edges.forEach(function(e) {
+                        graph.addEdge(e.source, e.target, e.attributes);
+                    });
+                    graph.setNodeAttribute(nodeId, 'label', hidden.label);
+                }
+            });
+        }
+"""
+
+# Hands the graph data to render(): inline in the page, or fetched from the
+# local server so the page paints before the JSON is parsed
+_INLINE_DATA_OPEN = """
+        render("""
+
+_INLINE_DATA_CLOSE = """);
+"""
+
+_FETCH_DATA = Template("""
+        fetch($data_url).then(function(response) {
+            return response.json();
+        }).then(render);
+""")
+
+_HTML_END = """    </script>
+</body>
+</html>"""
+
+
+def _acquire_shared_driver(config: Neo4jConfig) -> tuple[tuple[str, str, str], AsyncDriver]:
+    """Join the driver for config's URI and credentials, creating it for the first holder"""
+    # Hashed so the key (e.g. in a debugger or log) never shows the password
+    key = (config.uri, config.user, hashlib.sha256(config.password.encode()).hexdigest())
+    shared = _DRIVERS.get(key)
+    if shared is None:
+        shared = _DRIVERS[key] = _SharedDriver(
+            AsyncGraphDatabase.driver(
+                config.uri,
+                auth=(config.user, config.password),
+                max_connection_pool_size=50,
+            )
+        )
+    shared.users += 1
+    return key, shared.driver
+
+
+async def _release_shared_driver(key: tuple[str, str, str]) -> None:
+    """Leave a shared driver, closing its connection pool if this was the last holder"""
+    shared = _DRIVERS.get(key)
+    if shared is None:
+        return
+    shared.users -= 1
+    if shared.users == 0:
+        del _DRIVERS[key]
+        await shared.driver.close()
+        logger.debug("Neo4j connection closed")
+
+
+def _episode_match(days_back: Optional[int]) -> str:
+    """Cypher MATCH ... WHERE selecting the $user_id's episodes, with an index hint
+
+    A days_back window seeks the (group_id, valid_at) index on both
+    properties; all time uses the group_id index, which - unlike the
+    composite one - also holds episodes without valid_at. The hint keeps a
+    small or stale-statistics database from planning a label scan.
+    """
+    if days_back:
+        return """
+        MATCH (ep:Episodic)
+        USING INDEX ep:Episodic(group_id, valid_at)
+        WHERE ep.group_id = $user_id
+          AND ep.valid_at >= datetime() - duration({days: $days_back})"""
+    return """
+        MATCH (ep:Episodic)
+        USING INDEX ep:Episodic(group_id)
+        WHERE ep.group_id = $user_id"""
+
+
+async def _read_records(tx: AsyncManagedTransaction, query: str, params: Dict[str, Any]) -> list:
+    """Transaction function for session.execute_read: run a query and collect its records
+
+    Records are materialized inside the transaction, since the driver may
+    retry the function on transient errors and results don't outlive it.
+    """
+    result = await tx.run(query, params)
+    return [record async for record in result]
+
+
+# Local server for pages opened in a browser; runs on a daemon thread for the
+# life of the process so pages keep loading after visualize_user_graph returns
+_SERVER: Optional[ThreadingHTTPServer] = None
+
+# URL path -> (file on disk, whether it holds gzip-encoded JSON)
+_SERVED_FILES: Dict[str, tuple[Path, bool]] = {}
+
+
+class _VisualizationRequestHandler(BaseHTTPRequestHandler):
+    """Streams registered visualization files; graph data is sent pre-gzipped"""
+
+    def do_GET(self):
+        entry = _SERVED_FILES.get(unquote(urlsplit(self.path).path))
+        if entry is None or not entry[0].exists():
+            self.send_error(404)
+            return
+
+        path, gzipped = entry
+        self.send_response(200)
+        if gzipped:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Visualization server: {format % args}")
+
+
+def _data_file_for(html_path: Path) -> Path:
+    """Sibling file holding a served page's graph data as gzip JSON"""
+    return html_path.with_name(f"{html_path.stem}.data.json.gz")
+
+
+def _serve_visualization(html_path: str) -> str:
+    """Register a page and its data file with the local server, returning the page URL"""
+    global _SERVER
+    html_path = Path(html_path).absolute()
+    data_path = _data_file_for(html_path)
+    _SERVED_FILES[f"/{html_path.name}"] = (html_path, False)
+    _SERVED_FILES[f"/{data_path.stem}"] = (data_path, True)
+
+    if _SERVER is None:
+        _SERVER = ThreadingHTTPServer(("127.0.0.1", 0), _VisualizationRequestHandler)
+        _SERVER.daemon_threads = True
+        threading.Thread(
+            target=_SERVER.serve_forever, name="visualization-server", daemon=True
+        ).start()
+        logger.debug(f"Visualization server listening on port {_SERVER.server_address[1]}")
+
+    host, port = _SERVER.server_address[:2]
+    return f"http://{host}:{port}/{quote(html_path.name)}"
+
 
 class GraphVisualizer:
     """Visualizes per-user knowledge graphs stored in Neo4j"""
 
+    # From this many fetched nodes (deferred entities included, since the page
+    # can reveal them all) the layout is computed in Python and vis.js physics
+    # is disabled - in-browser stabilization would lock the page for seconds
+    OFFLINE_LAYOUT_MIN_NODES = 1000
+
+    # Entities sent with the initial render, most-mentioned first; the rest
+    # are embedded per episode and added when that episode is clicked
+    MAX_INITIAL_ENTITIES = 200
+
+    # Above this many fetched nodes the page uses sigma.js (WebGL) instead of
+    # vis.js (canvas 2D)
+    WEBGL_MIN_NODES = 1500
+
     def __init__(self, neo4j_config: Optional[Neo4jConfig] = None):
         """Initialize visualizer with Neo4j connection config
 
@@ -26,36 +483,55 @@ class GraphVisualizer:
             neo4j_config = Neo4jConfig()
 
         self.config = neo4j_config
-        self.driver = None
-        self._connect()
+        # Shared driver key and driver, acquired on first use and released by close()
+        self._driver_key: Optional[tuple[str, str, str]] = None
+        self._driver: Optional[AsyncDriver] = None
+        self._connected = False
+
+    @property
+    def driver(self) -> AsyncDriver:
+        """The shared driver for this visualizer's config, joined on first access"""
+        if self._driver is None:
+            self._driver_key, self._driver = _acquire_shared_driver(self.config)
+        return self._driver
 
-    def _connect(self):
-        """Establish connection to Neo4j"""
+    async def _connect(self):
+        """Verify the shared Neo4j connection (once per visualizer)"""
+        if self._connected:
+            return
         try:
-            self.driver = GraphDatabase.driver(
-                self.config.uri,
-                auth=(self.config.user, self.config.password)
-            )
-            # Verify connection
-            with self.driver.session() as session:
-                session.run("RETURN 1")
+            await self.driver.verify_connectivity()
+            self._connected = True
             logger.debug("Connected to Neo4j successfully")
         except Exception as e:
             logger.error(f"Failed to connect to Neo4j: {e}")
             raise
+        await self._ensure_indexes()
+
+    async def _ensure_indexes(self):
+        """Create the indexes the visualizer's queries rely on (idempotent)"""
+        try:
+            async with self.driver.session() as session:
+                for statement in _INDEX_STATEMENTS:
+                    await (await session.run(statement)).consume()
+        except Exception as e:
+            # Usually harmless - Graphiti creates episode_group_id at startup
+            logger.warning(f"Could not create visualizer indexes: {e}")
 
-    def close(self):
-        """Close Neo4j connection"""
-        if self.driver:
-            self.driver.close()
-            logger.debug("Neo4j connection closed")
+    async def close(self):
+        """Release the shared Neo4j driver; the last visualizer using it closes it"""
+        key, self._driver_key, self._driver = self._driver_key, None, None
+        self._connected = False
+        if key is not None:
+            await _release_shared_driver(key)
 
-    def visualize_user_graph(
+    async def visualize_user_graph(
         self,
         user_id: str,
         days_back: Optional[int] = None,
         output_file: Optional[str] = None,
-        open_browser: bool = True
+        open_browser: bool = True,
+        compress: bool = False
     ) -> str:
         """Generate and display interactive visualization of user's knowledge graph
 
@@ -63,26 +539,59 @@ class GraphVisualizer:
             user_id: User ID (matches group_id in Neo4j)
             days_back: Show last N days of data. None = all time
             output_file: Path to save HTML. If None, uses temp file
-            open_browser: Whether to automatically open in browser
+            open_browser: Whether to automatically open in browser. The page is
+                served from a local HTTP server and fetches its graph data
+                separately; otherwise the data is inlined in a standalone file
+            compress: Write gzip-compressed HTML (``.html.gz``) for serving over
+                HTTP. Browsers can't open it from disk, so open_browser is ignored
 
         Returns:
-            Path to generated HTML file
+            Local URL of the page when opened in a browser, otherwise the path
+            to the generated HTML file
         """
+        if compress and open_browser:
+            logger.info("Compressed visualization requested, not opening a browser")
+            open_browser = False
+
         try:
-            # Fetch graph data
-            logger.info(f"Fetching graph data for user: {user_id}")
-            nodes, edges, stats = self._fetch_graph_data(user_id, days_back)
+            await self._connect()
+
+            # One session for both queries; released before rendering
+            async with self.driver.session() as session:
+                # Reuse the last rendering if no episode was added or aged out since
+                cache_key = (user_id, days_back or None, output_file, compress, open_browser)
+                fingerprint = await self._fetch_fingerprint(user_id, days_back, session=session)
+                cached = _HTML_CACHE.get(cache_key)
+                if (
+                    cached and cached[1:] == fingerprint and Path(cached[0]).exists()
+                    and (not open_browser or _data_file_for(Path(cached[0])).exists())
+                ):
+                    logger.info(f"Graph unchanged for user {user_id}, reusing {cached[0]}")
+                    print(f"\n✅ Graph unchanged since last visualization")
+                    print(f"   File: {cached[0]}")
+                    return self._open_output(cached[0], open_browser)
+
+                # Fetch graph data
+                logger.info(f"Fetching graph data for user: {user_id}")
+                nodes, edges, stats = await self._fetch_graph_data(
+                    user_id, days_back, session=session
+                )
 
             if not nodes:
                 print(f"\n⚠️  No conversation data found for user '{user_id}'")
                 print("   Chat with the agent first to build the knowledge graph.")
                 return None
 
-            # Render visualization
+            # Render visualization in a worker thread: the spring layout and the
+            # file writes take seconds on large graphs, and the loop is shared
+            # with the agents' memory clients (main.py)
             logger.info(f"Rendering visualization ({len(nodes)} nodes, {len(edges)} edges)")
-            output_path = self._render_visualization(
-                nodes, edges, stats, user_id, days_back, output_file
+            output_path = await asyncio.to_thread(
+                self._render_visualization,
+                nodes, edges, stats, user_id, days_back, output_file, compress,
+                serve=open_browser
             )
+            _HTML_CACHE[cache_key] = (output_path, *fingerprint)
 
             # Display info
             time_range = f"last {days_back} days" if days_back else "all time"
@@ -92,115 +601,161 @@ class GraphVisualizer:
             print(f"   Nodes: {stats['node_count']} | Episodes: {stats['episode_count']} | Relationships: {len(edges)}")
             print(f"   File: {output_path}")
 
-            # Open in browser
-            if open_browser:
-                webbrowser.open(f"file://{Path(output_path).absolute()}")
-                print("   Opening in browser...\n")
-            else:
-                print(f"\n   Open the file to view: {output_path}\n")
-
-            return output_path
+            return self._open_output(output_path, open_browser)
 
         except Exception as e:
             logger.error(f"Error visualizing graph: {e}", exc_info=True)
             print(f"\n❌ Error: {e}")
             return None
 
-    def _fetch_graph_data(
+    @staticmethod
+    def _open_output(output_path: str, open_browser: bool) -> str:
+        """Serve the rendered page to a browser, or tell the user where it is
+
+        Returns:
+            The page URL when served, otherwise output_path
+        """
+        if open_browser:
+            url = _serve_visualization(output_path)
+            webbrowser.open(url)
+            print(f"   Serving at {url}")
+            print("   Opening in browser...\n")
+            return url
+        print(f"\n   Open the file to view: {output_path}\n")
+        return output_path
+
+    async def _fetch_fingerprint(
         self,
         user_id: str,
-        days_back: Optional[int] = None
-    ) -> tuple[List[Dict], List[Dict], Dict[str, Any]]:
+        days_back: Optional[int] = None,
+        *,
+        session: Optional[AsyncSession] = None
+    ) -> tuple[Any, int]:
+        """Return (latest valid_at, episode count) for the user's episodes in the window
+
+        A one-row query that changes whenever an episode is added or falls out
+        of the days_back window, used to validate the HTML cache. Runs on
+        session if given, otherwise on a new one.
+        """
+        query = _episode_match(days_back) + """
+        RETURN max(ep.valid_at) AS latest, count(ep) AS count
+        """
+        async with nullcontext(session) if session else self.driver.session() as s:
+            records = await s.execute_read(
+                _read_records, query, {"user_id": user_id, "days_back": days_back or None}
+            )
+        # Aggregation always yields exactly one row
+        return records[0]["latest"], records[0]["count"]
+
+    async def _fetch_graph_data(
+        self,
+        user_id: str,
+        days_back: Optional[int] = None,
+        *,
+        session: Optional[AsyncSession] = None
+    ) -> tuple[List[NodeRec], List[Dict], Dict[str, Any]]:
         """Fetch graph data from Neo4j for a specific user
 
+        Runs on session if given (left open for the caller), otherwise on a
+        new one.
+
         Returns:
             Tuple of (nodes, edges, stats_dict)
         """
         try:
-            with self.driver.session() as session:
-                # Build Cypher query with optional time filter
-                time_filter = ""
-                params = {"user_id": user_id}
-
-                if days_back:
-                    time_filter = f"AND ep.valid_at >= datetime() - duration({{days: {days_back}}})"
+            async with nullcontext(session) if session else self.driver.session() as s:
+                # days_back is bound as a parameter so every window reuses one
+                # cached query plan (all time gets its own, see _episode_match)
+                params = {"user_id": user_id, "days_back": days_back or None}
 
                 # Query episodes (Episodic nodes) and their relationships
                 # Graphiti schema: :Episodic nodes, :MENTIONS/:RELATES_TO relationships
-                query = f"""
-                MATCH (ep:Episodic)
-                WHERE ep.group_id = $user_id {time_filter}
+                # Aggregate on the server so each episode arrives once with its
+                # entities and relationship types inline. Only the columns used
+                # below are projected (no entity embeddings), and titles and
+                # labels are truncated here so full bodies never cross the wire.
+                query = _episode_match(days_back) + """
+                WITH ep ORDER BY ep.valid_at DESC LIMIT 500
                 OPTIONAL MATCH (ep)-[r:MENTIONS]-(entity:Entity)
-                RETURN ep, r, entity
+                RETURN ep{_id: id(ep),
+                          valid_at: coalesce(ep.valid_at, ep.created_at),
+                          title: substring(coalesce(ep.content, ep.name, ''), 0, 200)} AS ep,
+                       collect(DISTINCT entity{_id: id(entity),
+                          _type: coalesce(labels(entity)[0], 'Entity'),
+                          _label: substring(coalesce(entity.name, toString(id(entity))), 0, 30),
+                          _title: substring(coalesce(entity.summary, entity.name, ''), 0, 200)}) AS entities,
+                       collect(DISTINCT {eid: id(entity), type: type(r)}) AS rels
                 ORDER BY ep.valid_at DESC
-                LIMIT 500
                 """
 
                 logger.debug(f"Executing query with user_id={user_id}, days_back={days_back}")
-                result = session.run(query, params)
+                records = await s.execute_read(_read_records, query, params)
 
                 # Process results into nodes and edges
-                nodes_dict = {}  # id -> node_data
+                nodes_dict: Dict[int, NodeRec] = {}
                 edges = []
-                episodes = []
+                episode_count = 0
+                latest_ep_time = None
 
-                for record in result:
+                for record in records:
                     ep = record["ep"]
-                    rel = record["r"]
-                    entity = record["entity"]
+                    ep_id = ep["_id"]
 
                     # Add episode (Episodic) node
-                    ep_id = ep.id
-                    if ep_id not in nodes_dict:
-                        # Get valid_at timestamp (Graphiti uses valid_at, not reference_time)
-                        valid_at = ep.get('valid_at', ep.get('created_at', 'unknown'))
-                        if valid_at:
-                            timestamp_str = str(valid_at)[:10]
-                        else:
-                            timestamp_str = 'unknown'
-
-                        nodes_dict[ep_id] = {
-                            "id": ep_id,
-                            "label": f"Episode\n{timestamp_str}",
-                            "title": ep.get("content", ep.get("name", ""))[:200],
-                            "type": "episode",
-                            "properties": dict(ep)
-                        }
-                        episodes.append(ep)
+                    # Graphiti uses valid_at, not reference_time; the query falls
+                    # back to created_at
+                    valid_at = ep["valid_at"]
+                    if valid_at:
+                        timestamp_str = str(valid_at)[:10]
+                    else:
+                        timestamp_str = 'unknown'
 
-                    # Add entity node and relationship
-                    if entity:
-                        entity_id = entity.id
+                    nodes_dict[ep_id] = NodeRec(
+                        id=ep_id,
+                        label=f"Episode\n{timestamp_str}",
+                        title=ep["title"],
+                        type="episode",
+                        color=_COLORS["episode"],
+                        shape=_SHAPES["episode"]
+                    )
+                    # Rows arrive newest first
+                    if episode_count == 0:
+                        latest_ep_time = valid_at
+                    episode_count += 1
+
+                    # Add entity nodes (entities can be shared across episodes)
+                    for entity in record["entities"]:
+                        entity_id = entity["_id"]
                         if entity_id not in nodes_dict:
-                            entity_labels = list(entity.labels) if hasattr(entity, 'labels') else ['Entity']
-                            nodes_dict[entity_id] = {
-                                "id": entity_id,
-                                "label": entity.get("name", str(entity_id))[:30],
-                                "title": dict(entity),
-                                "type": entity_labels[0] if entity_labels else "Entity",
-                                "properties": dict(entity)
-                            }
+                            entity_type = entity["_type"]
+                            nodes_dict[entity_id] = NodeRec(
+                                id=entity_id,
+                                label=entity["_label"],
+                                title=entity["_title"],
+                                type=entity_type,
+                                color=_COLORS.get(entity_type, "#999999"),
+                                shape=_SHAPES.get(entity_type, "dot")
+                            )
 
-                        # Add edge
-                        if rel:
+                    # Add edges (an episode with no entities yields a single null rel).
+                    # Each episode arrives once with its rels collected DISTINCT, so
+                    # (episode, entity, type) is already unique - no dedup needed here
+                    for rel in record["rels"]:
+                        if rel["eid"] is not None:
                             edges.append({
                                 "from": ep_id,
-                                "to": entity_id,
-                                "label": rel.type,
-                                "title": rel.type
+                                "to": rel["eid"],
+                                "label": rel["type"],
+                                "title": rel["type"]
                             })
 
                 nodes = list(nodes_dict.values())
 
                 # Calculate statistics
-                latest_ep_time = None
-                if episodes:
-                    latest_ep_time = episodes[0].get("valid_at", episodes[0].get("created_at"))
-
                 stats = {
                     "node_count": len(nodes),
-                    "episode_count": len(episodes),
-                    "entity_count": len(nodes) - len(episodes),
+                    "episode_count": episode_count,
+                    "entity_count": len(nodes) - episode_count,
                     "edge_count": len(edges),
                     "time_range": f"last {days_back} days" if days_back else "all time",
                     "latest_episode": latest_ep_time
@@ -215,17 +770,22 @@ class GraphVisualizer:
 
     def _render_visualization(
         self,
-        nodes: List[Dict],
+        nodes: List[NodeRec],
         edges: List[Dict],
         stats: Dict[str, Any],
         user_id: str,
         days_back: Optional[int],
-        output_file: Optional[str]
+        output_file: Optional[str],
+        compress: bool = False,
+        serve: bool = False
     ) -> str:
         """Render nodes and edges as interactive HTML visualization
 
+        With serve set, the graph data goes to a sibling ``.data.json.gz`` file
+        that the page fetches, instead of being inlined.
+
         Returns:
-            Path to generated HTML file
+            Path to generated HTML file (``.gz`` appended when compress is set)
         """
         # Create output file path
         if output_file is None:
@@ -236,266 +796,310 @@ class GraphVisualizer:
         else:
             output_file = Path(output_file)
 
-        # Create HTML content
-        html_content = self._create_html_visualization(
-            nodes, edges, stats, user_id, days_back
-        )
+        if compress:
+            output_file = output_file.with_name(output_file.name + ".gz")
+
+        # Large graphs get fixed positions so the browser only has to draw them;
+        # sigma.js has no layout of its own, so it always needs them. Decided
+        # and laid out before deferral: the deferred entities are part of the
+        # graph the page grows to, and keep their positions when revealed
+        webgl = len(nodes) > self.WEBGL_MIN_NODES
+        offline_layout = webgl or len(nodes) >= self.OFFLINE_LAYOUT_MIN_NODES
+        if offline_layout:
+            self._compute_layout(nodes, edges)
+
+        nodes, edges, deferred = self._defer_low_degree_entities(nodes, edges)
 
-        # Write HTML file
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        data_url = None
+        if serve:
+            data_file = _data_file_for(output_file)
+            with gzip.open(data_file, "wb", compresslevel=6) as data:
+                self._write_graph_data(data, nodes, edges, deferred, webgl)
+            data_url = f"./{quote(data_file.stem)}"
+
+        # Write HTML file (UTF-8 bytes, as produced by orjson)
+        if compress:
+            f = gzip.open(output_file, "wb", compresslevel=6)
+        else:
+            f = open(output_file, "wb", buffering=_WRITE_BUFFER_SIZE)
+        with f:
+            self._write_html_visualization(
+                f, nodes, edges, deferred, stats, user_id, days_back,
+                physics=not offline_layout, webgl=webgl, data_url=data_url
+            )
 
         logger.info(f"Visualization saved to {output_file}")
         return str(output_file)
 
-    def _create_html_visualization(
+    def _defer_low_degree_entities(
         self,
-        nodes: List[Dict],
+        nodes: List[NodeRec],
+        edges: List[Dict]
+    ) -> tuple[List[NodeRec], List[Dict], Dict[Any, tuple[List[NodeRec], List[Dict]]]]:
+        """Keep the MAX_INITIAL_ENTITIES most-mentioned entities, defer the rest
+
+        Returns:
+            Tuple of (visible_nodes, visible_edges, deferred) where deferred maps
+            an episode id to the (entity nodes, edges) hidden under it
+        """
+        entities = [n for n in nodes if n.type != "episode"]
+        if len(entities) <= self.MAX_INITIAL_ENTITIES:
+            return nodes, edges, {}
+
+        # Edges run episode -> entity, so an entity's degree is its mention count
+        degree = Counter(e["to"] for e in edges)
+        keep = {
+            n.id for n in heapq.nlargest(
+                self.MAX_INITIAL_ENTITIES, entities, key=lambda n: degree[n.id]
+            )
+        }
+        hidden = {n.id: n for n in entities if n.id not in keep}
+
+        visible_edges = []
+        deferred = {}
+        for e in edges:
+            entity = hidden.get(e["to"])
+            if entity is None:
+                visible_edges.append(e)
+            else:
+                held_nodes, held_edges = deferred.setdefault(e["from"], ([], []))
+                held_nodes.append(entity)
+                held_edges.append(e)
+
+        visible_nodes = [n for n in nodes if n.id not in hidden]
+        logger.debug(f"Deferred {len(hidden)} low-degree entities across {len(deferred)} episodes")
+        return visible_nodes, visible_edges, deferred
+
+    @staticmethod
+    def _compute_layout(nodes: List[NodeRec], edges: List[Dict]):
+        """Set fixed x/y positions on each node with a NetworkX spring layout"""
+        graph = nx.Graph()
+        graph.add_nodes_from(n.id for n in nodes)
+        graph.add_edges_from((e["from"], e["to"]) for e in edges)
+
+        # spring_layout returns coordinates in [-scale, scale]; grow the canvas
+        # with the node count so nodes keep roughly constant spacing
+        positions = nx.spring_layout(
+            graph, iterations=50, seed=42, scale=100 * math.sqrt(len(nodes))
+        )
+        for n in nodes:
+            x, y = positions[n.id]
+            n.x, n.y = round(float(x), 1), round(float(y), 1)
+
+    def _write_html_visualization(
+        self,
+        f,
+        nodes: List[NodeRec],
         edges: List[Dict],
+        deferred: Dict[Any, tuple[List[NodeRec], List[Dict]]],
         stats: Dict[str, Any],
         user_id: str,
-        days_back: Optional[int]
-    ) -> str:
-        """Create interactive HTML visualization using vis.js
+        days_back: Optional[int],
+        physics: bool = True,
+        webgl: bool = False,
+        data_url: Optional[str] = None
+    ):
+        """Stream an interactive visualization into an open binary file
 
-        Uses vis.js library (CDN) for interactive graph visualization
+        Nodes and edges are serialized one at a time between the static
+        template pieces, so the page is never held in memory as one string.
+        Renders with vis.js, or with sigma.js (WebGL) when webgl is set. With
+        data_url the page fetches its graph data rather than inlining it.
         """
         time_range_text = f"Last {days_back} days" if days_back else "All time"
 
-        # Convert nodes and edges to JSON
-        import json
-        nodes_json = json.dumps([
-            {
-                "id": n["id"],
-                "label": n["label"],
-                "title": str(n["title"])[:200],
-                "color": self._get_node_color(n["type"]),
-                "shape": self._get_node_shape(n["type"])
-            }
-            for n in nodes
-        ])
+        page_head = _HTML_HEAD.substitute(
+            user_id=user_id,
+            time_range=time_range_text,
+            episode_count=stats["episode_count"],
+            entity_count=stats["entity_count"],
+            edge_count=stats["edge_count"],
+            generated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            renderer_scripts=_SIGMA_SCRIPTS if webgl else _VIS_SCRIPTS,
+        )
+        f.write(page_head.encode())
+        if webgl:
+            f.write(_SIGMA_RENDER.encode())
+        else:
+            f.write(_VIS_RENDER.substitute(physics="true" if physics else "false").encode())
+
+        if data_url is None:
+            f.write(_INLINE_DATA_OPEN.encode())
+            self._write_graph_data(f, nodes, edges, deferred, webgl)
+            f.write(_INLINE_DATA_CLOSE.encode())
+        else:
+            f.write(_FETCH_DATA.substitute(data_url=orjson.dumps(data_url).decode()).encode())
+        f.write(_HTML_END.encode())
 
-        edges_json = json.dumps([
-            {
+    def _write_graph_data(
+        self,
+        f,
+        nodes: List[NodeRec],
+        edges: List[Dict],
+        deferred: Dict[Any, tuple[List[NodeRec], List[Dict]]],
+        webgl: bool
+    ):
+        """Write the {nodes, edges, deferred} object consumed by the page's render()"""
+        if webgl:
+            iter_nodes, iter_edges = self._iter_graphology_nodes, self._iter_graphology_edges
+        else:
+            iter_nodes, iter_edges = self._iter_vis_nodes, self._iter_vis_edges
+
+        f.write(b'{"nodes":')
+        self._write_json_array(f, iter_nodes(nodes, deferred))
+        f.write(b',"edges":')
+        self._write_json_array(f, iter_edges(edges))
+        f.write(b',"deferred":')
+        self._write_deferred(f, nodes, deferred, iter_nodes, iter_edges)
+        f.write(b"}")
+
+    def _write_deferred(
+        self,
+        f,
+        nodes: List[NodeRec],
+        deferred: Dict[Any, tuple[List[NodeRec], List[Dict]]],
+        iter_nodes,
+        iter_edges
+    ):
+        """Write the held-back entities as a JSON object keyed by episode id"""
+        labels = {n.id: n.label for n in nodes if n.id in deferred}
+        f.write(b"{")
+        for i, (ep_id, (held_nodes, held_edges)) in enumerate(deferred.items()):
+            if i:
+                f.write(b",")
+            f.write(orjson.dumps(str(ep_id)) + b':{"label":' + orjson.dumps(labels[ep_id]) + b',"nodes":')
+            self._write_json_array(f, iter_nodes(held_nodes))
+            f.write(b',"edges":')
+            self._write_json_array(f, iter_edges(held_edges))
+            f.write(b"}")
+        f.write(b"}")
+
+    @staticmethod
+    def _display_label(n: NodeRec, deferred: Optional[Dict]) -> str:
+        """Node label, with a "(+N)" suffix on episodes whose entities are deferred"""
+        if deferred and n.id in deferred:
+            return f"{n.label}\n(+{len(deferred[n.id][0])})"
+        return n.label
+
+    @classmethod
+    def _iter_vis_nodes(cls, nodes: List[NodeRec], deferred: Optional[Dict] = None):
+        """Yield vis.js nodes as [id, label, title, color, shape] rows
+
+        The page maps rows back to objects (toVisNode), which keeps the JSON
+        free of repeated keys. x and y are appended when a layout was computed.
+        """
+        for n in nodes:
+            row = [n.id, cls._display_label(n, deferred), n.title, n.color, n.shape]
+            if n.x is not None:
+                row += (n.x, n.y)
+            yield row
+
+    @staticmethod
+    def _iter_vis_edges(edges: List[Dict]):
+        """Yield vis.js edge objects"""
+        for e in edges:
+            yield {
                 "from": e["from"],
                 "to": e["to"],
                 "label": e.get("label", ""),
                 "title": e.get("title", "")
             }
-            for e in edges
-        ])
-
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Knowledge Graph - {user_id}</title>
-    <script type="text/javascript" src="https://unpkg.com/vis-network/standalone/umd/vis-network.min.js"></script>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 0;
-        }}
-        #header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        #header h1 {{
-            margin: 0;
-            font-size: 24px;
-        }}
-        #stats {{
-            font-size: 14px;
-            margin-top: 10px;
-            opacity: 0.9;
-        }}
-        #network {{
-            width: 100%;
-            height: calc(100vh - 150px);
-            border: 1px solid #ddd;
-        }}
-        #footer {{
-            background: #f5f5f5;
-            padding: 10px 20px;
-            font-size: 12px;
-            color: #666;
-            border-top: 1px solid #ddd;
-        }}
-        .legend {{
-            display: flex;
-            gap: 20px;
-            margin-top: 10px;
-            flex-wrap: wrap;
-        }}
-        .legend-item {{
-            display: flex;
-            align-items: center;
-            gap: 8px;
-            font-size: 13px;
-        }}
-        .legend-circle {{
-            width: 16px;
-            height: 16px;
-            border-radius: 50%;
-        }}
-    </style>
-</head>
-<body>
-    <div id="header">
-        <h1>📊 Knowledge Graph Visualization</h1>
-        <div id="stats">
-            <strong>User:</strong> {user_id} |
-            <strong>Time Range:</strong> {time_range_text} |
-            <strong>Episodes:</strong> {stats['episode_count']} |
-            <strong>Entities:</strong> {stats['entity_count']} |
-            <strong>Relationships:</strong> {stats['edge_count']}
-        </div>
-        <div class="legend">
-            <div class="legend-item">
-                <div class="legend-circle" style="background-color: #667eea;"></div>
-                <span>Episodes</span>
-            </div>
-            <div class="legend-item">
-                <div class="legend-circle" style="background-color: #764ba2;"></div>
-                <span>Entities</span>
-            </div>
-        </div>
-    </div>
-
-    <div id="network"></div>
 
-    <div id="footer">
-        Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} |
-        Drag to pan, scroll to zoom, click nodes for details
-    </div>
-
-    <script type="text/javascript">
-        var nodes = new vis.DataSet({nodes_json});
-        var edges = new vis.DataSet({edges_json});
-
-        var data = {{
-            nodes: nodes,
-            edges: edges
-        }};
-
-        var options = {{
-            physics: {{
-                enabled: true,
-                stabilization: {{
-                    iterations: 200
-                }},
-                forceAtlas2Based: {{
-                    gravitationalConstant: -26,
-                    centralGravity: 0.005,
-                    springLength: 200,
-                    springConstant: 0.08
-                }},
-                maxVelocity: 50,
-                timestep: 0.35,
-                solver: 'forceAtlas2Based'
-            }},
-            interaction: {{
-                navigationButtons: true,
-                keyboard: true,
-                zoomView: true,
-                dragView: true
-            }},
-            nodes: {{
-                font: {{
-                    size: 14
-                }}
-            }},
-            edges: {{
-                arrows: 'to',
-                smooth: {{
-                    type: 'continuous'
-                }},
-                color: {{
-                    color: '#999999',
-                    highlight: '#ff6b6b'
-                }}
-            }}
-        }};
-
-        var container = document.getElementById('network');
-        var network = new vis.Network(container, data, options);
-
-        network.on('click', function(params) {{
-            if (params.nodes.length > 0) {{
-                var nodeId = params.nodes[0];
-                var node = nodes.get(nodeId);
-                console.log('Selected node:', node);
-            }}
-        }});
-    </script>
-</body>
-</html>"""
-
-        return html
+    @classmethod
+    def _iter_graphology_nodes(cls, nodes: List[NodeRec], deferred: Optional[Dict] = None):
+        """Yield graphology node entries ({key, attributes}) for sigma.js"""
+        for n in nodes:
+            yield {
+                "key": str(n.id),
+                "attributes": {
+                    "label": cls._display_label(n, deferred),
+                    "title": n.title,
+                    "color": n.color,
+                    "size": 8 if n.type == "episode" else 5,
+                    # The sigma.js page is always laid out offline
+                    "x": n.x,
+                    "y": n.y
+                }
+            }
 
     @staticmethod
-    def _get_node_color(node_type: str) -> str:
-        """Get color for node type"""
-        colors = {
-            "episode": "#667eea",
-            "Entity": "#764ba2",
-            "Person": "#f093fb",
-            "Organization": "#4facfe",
-            "Location": "#43e97b",
-            "Event": "#fa709a"
-        }
-        return colors.get(node_type, "#999999")
+    def _iter_graphology_edges(edges: List[Dict]):
+        """Yield graphology edge entries ({source, target, attributes}) for sigma.js"""
+        for e in edges:
+            yield {
+                "source": str(e["from"]),
+                "target": str(e["to"]),
+                "attributes": {"label": e.get("label", "")}
+            }
 
     @staticmethod
-    def _get_node_shape(node_type: str) -> str:
-        """Get shape for node type"""
-        shapes = {
-            "episode": "box",
-            "Entity": "dot",
-            "Person": "diamond",
-            "Organization": "ellipse",
-            "Location": "triangle"
-        }
-        return shapes.get(node_type, "dot")
+    def _write_json_array(f, items):
+        """Write an iterable as a JSON array without building the full string"""
+        f.write(b"[")
+        for i, item in enumerate(items):
+            if i:
+                f.write(b",")
+            f.write(orjson.dumps(item))
+        f.write(b"]")
 
-    def get_user_statistics(self, user_id: str) -> Dict[str, Any]:
+    async def get_user_statistics(
+        self,
+        user_id: str,
+        *,
+        session: Optional[AsyncSession] = None
+    ) -> Dict[str, Any]:
         """Get statistics about a user's knowledge graph
 
         Returns:
             Dictionary with stats like episode_count, entity_count, etc.
         """
+        return (await self.get_user_statistics_batch([user_id], session=session))[user_id]
+
+    async def get_user_statistics_batch(
+        self,
+        user_ids: List[str],
+        *,
+        session: Optional[AsyncSession] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Get knowledge graph statistics for many users in one query
+
+        Runs on session if given, otherwise on a new one.
+
+        Returns:
+            Dictionary mapping each user_id to its stats (zeros for users with
+            no episodes), in the order given
+        """
         try:
-            with self.driver.session() as session:
+            await self._connect()
+            async with nullcontext(session) if session else self.driver.session() as s:
                 # Use correct Graphiti schema: :Episodic nodes
                 query = """
+                UNWIND $user_ids AS user_id
                 MATCH (ep:Episodic)
-                WHERE ep.group_id = $user_id
+                USING INDEX ep:Episodic(group_id)
+                WHERE ep.group_id = user_id
                 OPTIONAL MATCH (ep)-[r]-(entity:Entity)
-                WITH COUNT(DISTINCT ep) as episode_count,
-                     COUNT(DISTINCT entity) as entity_count,
-                     COUNT(DISTINCT r) as rel_count
-                RETURN episode_count, entity_count, rel_count
+                RETURN user_id,
+                       COUNT(DISTINCT ep) as episode_count,
+                       COUNT(DISTINCT entity) as entity_count,
+                       COUNT(DISTINCT r) as rel_count
                 """
 
-                result = session.run(query, {"user_id": user_id}).single()
+                records = await s.execute_read(
+                    _read_records, query, {"user_ids": list(user_ids)}
+                )
+                rows = {record["user_id"]: record for record in records}
 
-                if result:
-                    return {
-                        "episode_count": result["episode_count"],
-                        "entity_count": result["entity_count"],
-                        "relationship_count": result["rel_count"],
-                        "user_id": user_id
-                    }
-                else:
-                    return {
-                        "episode_count": 0,
-                        "entity_count": 0,
-                        "relationship_count": 0,
-                        "user_id": user_id
-                    }
+            stats = {}
+            for user_id in user_ids:
+                row = rows.get(user_id)
+                stats[user_id] = {
+                    "episode_count": row["episode_count"] if row else 0,
+                    "entity_count": row["entity_count"] if row else 0,
+                    "relationship_count": row["rel_count"] if row else 0,
+                    "user_id": user_id
+                }
+            return stats
         except Exception as e:
             logger.error(f"Error getting user statistics: {e}")
             raise
@@ -33,7 +33,7 @@ def test_agent_conversation():
     # TEST 1: Initialization
     print_section("TEST 1: Agent Initialization")
     try:
-        print("✓ Creating SyncMemoryAgent...")
+        print("✓ Creating SyncMemoryAgent (shared by the remaining tests)...")
         agent = SyncMemoryAgent(user_id="conversation_test_user")
 
         print(f"✓ Agent name: {agent._async_agent.agent_config.name}")
@@ -43,19 +43,23 @@ def test_agent_conversation():
         print(f"✓ Temperature: 0.7")
 
         print("\n✅ TEST 1 PASSED: Agent initialized successfully\n")
-        agent.close()
     except Exception as e:
         print(f"\n❌ TEST 1 FAILED: {e}\n")
         import traceback
         traceback.print_exc()
         return False
 
+    try:
+        return _run_agent_tests(agent)
+    finally:
+        agent.close()
+
+
+def _run_agent_tests(agent: SyncMemoryAgent) -> bool:
+    """Run the tests that share the agent created in TEST 1"""
     # TEST 2: Tool Definitions
     print_section("TEST 2: Tool Schema & Function Calling")
     try:
-        print("✓ Creating agent...")
-        agent = SyncMemoryAgent(user_id="tool_test")
-
         print("✓ Getting tool definitions...")
         tools = agent._async_agent._get_tool_definitions()
 
@@ -74,10 +78,8 @@ def test_agent_conversation():
             print(f"  ✓ Parameters: {list(web_search_tool['parameters']['properties'].keys())}")
 
             print("\n✅ TEST 2 PASSED: Tool definitions correct\n")
-            agent.close()
         else:
             print("\n❌ TEST 2 FAILED: web_search tool not found\n")
-            agent.close()
             return False
 
     except Exception as e:
@@ -89,9 +91,6 @@ def test_agent_conversation():
     # TEST 3: System Prompt
     print_section("TEST 3: System Prompt Generation")
     try:
-        print("✓ Creating agent...")
-        agent = SyncMemoryAgent(user_id="prompt_test")
-
         print("✓ Generating system prompt...")
         system_prompt = agent._async_agent._create_system_prompt()
 
@@ -110,10 +109,8 @@ def test_agent_conversation():
 
         if has_agent_name and has_memory_mention and has_web_search_mention:
             print("\n✅ TEST 3 PASSED: System prompt correctly structured\n")
-            agent.close()
         else:
             print("\n⚠️ TEST 3 FAILED: Missing key elements\n")
-            agent.close()
             return False
 
     except Exception as e:
@@ -125,9 +122,6 @@ def test_agent_conversation():
     # TEST 4: Conversation History Management
     print_section("TEST 4: Conversation History Management")
     try:
-        print("✓ Creating agent...")
-        agent = SyncMemoryAgent(user_id="history_test")
-
         print("✓ Testing clear_history() method...")
         history_before = agent._async_agent.conversation_history.copy()
         agent.clear_history()
@@ -139,10 +133,8 @@ def test_agent_conversation():
 
         if len(history_after) == 0:
             print("\n✅ TEST 4 PASSED: Conversation history management working\n")
-            agent.close()
         else:
             print("\n❌ TEST 4 FAILED: History not cleared\n")
-            agent.close()
             return False
 
     except Exception as e:
@@ -0,0 +1,111 @@
+"""Offline tests for the query embedding cache (no Neo4j or OpenAI needed)"""
+
+import numpy as np
+import pytest
+
+import src.embedding_cache as embedding_cache
+from src.embedding_cache import QueryEmbeddingCache
+
+VECTOR = [0.25, -0.5, 1.0, 0.0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Empty cache backed by a SQLite file under tmp_path"""
+    cache = QueryEmbeddingCache("text-embedding-3-small", len(VECTOR), path=tmp_path / "emb.sqlite3")
+    yield cache
+    cache.close()
+
+
+async def test_store_then_lookup(cache):
+    await cache.store("alice", "what do I like?", VECTOR)
+
+    # float32 on disk; these values are exact in float32
+    assert await cache.lookup("alice", "what do I like?") == VECTOR
+    assert await cache.lookup("alice", "what do I dislike?") is None
+
+
+async def test_entries_are_per_user(cache):
+    await cache.store("alice", "q", VECTOR)
+
+    assert await cache.lookup("bob", "q") is None
+
+
+async def test_model_and_dimensions_are_part_of_the_key(cache, tmp_path):
+    await cache.store("alice", "q", VECTOR)
+
+    other_model = QueryEmbeddingCache("text-embedding-3-large", len(VECTOR), path=cache.path)
+    other_dim = QueryEmbeddingCache(cache.model, len(VECTOR) * 2, path=cache.path)
+    same = QueryEmbeddingCache(cache.model, cache.dim, path=cache.path)
+    try:
+        assert await other_model.lookup("alice", "q") is None
+        assert await other_dim.lookup("alice", "q") is None
+        # Persisted: a new instance on the same file hits
+        assert await same.lookup("alice", "q") == VECTOR
+    finally:
+        for c in (other_model, other_dim, same):
+            c.close()
+
+
+async def test_expired_entries_miss_and_are_dropped(cache, monkeypatch):
+    await cache.store("alice", "old", VECTOR)
+    later = embedding_cache.time.time() + cache.ttl_seconds + 1
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: later)
+
+    assert await cache.lookup("alice", "old") is None
+
+    # The next store evicts expired rows, whoever they belong to
+    await cache.store("bob", "new", VECTOR)
+    monkeypatch.undo()
+    assert await cache.lookup("alice", "old") is None
+    assert await cache.lookup("bob", "new") == VECTOR
+
+
+async def test_per_user_cap_evicts_oldest(tmp_path, monkeypatch):
+    cache = QueryEmbeddingCache("m", len(VECTOR), path=tmp_path / "emb.sqlite3", max_entries=2)
+    now = [embedding_cache.time.time()]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    try:
+        for query in ("q0", "q1", "q2"):
+            await cache.store("alice", query, VECTOR)
+            now[0] += 1
+        await cache.store("bob", "q0", VECTOR)
+
+        assert await cache.lookup("alice", "q0") is None
+        assert await cache.lookup("alice", "q1") == VECTOR
+        assert await cache.lookup("alice", "q2") == VECTOR
+        # Another user's entries don't count against alice's cap
+        assert await cache.lookup("bob", "q0") == VECTOR
+    finally:
+        cache.close()
+
+
+async def test_purge_user(cache):
+    await cache.store("alice", "q", VECTOR)
+    await cache.store("bob", "q", VECTOR)
+
+    await cache.purge_user("alice")
+
+    assert await cache.lookup("alice", "q") is None
+    assert await cache.lookup("bob", "q") == VECTOR
+
+
+async def test_unopenable_file_disables_cache(tmp_path):
+    # The parent "directory" is a file, so the database can't be created
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    cache = QueryEmbeddingCache("m", len(VECTOR), path=blocker / "emb.sqlite3")
+
+    await cache.store("alice", "q", VECTOR)
+
+    assert await cache.lookup("alice", "q") is None
+    assert cache._disabled
+
+
+def test_vectors_round_trip_through_float32(cache):
+    vector = np.random.default_rng(0).standard_normal(len(VECTOR)).tolist()
+    cache._store_sync("alice", "q", vector)
+
+    restored = cache._lookup_sync("alice", "q")
+
+    assert np.allclose(restored, vector, rtol=1e-6)
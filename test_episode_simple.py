@@ -1,17 +1,20 @@
-#!/usr/bin/env python3
 """Simple test for episode creation with Graphiti Azure OpenAI"""
 
-import asyncio
 from datetime import datetime
+
+import pytest
+
 from src.graphiti_client import GraphitiMemoryClient
 
+# Every test talks to Neo4j (and most to OpenAI) - see conftest.py
+pytestmark = pytest.mark.usefixtures("warm_memory_pools")
+
+
+@pytest.mark.xdist_group(name="test_user")
 async def test_episode_creation():
     """Test adding an episode"""
-    client = GraphitiMemoryClient()
-
-    try:
-        print("1. Initializing Graphiti...")
-        await client.initialize()
+    print("1. Initializing Graphiti...")
+    async with GraphitiMemoryClient() as client:
         print("   ✅ Initialized")
 
         print("\n2. Creating a test episode...")
@@ -33,23 +36,9 @@ Agent: Python is a high-level programming language."""
             num_results=5,
             user_id="test_user"
         )
-        # results is now a list from Graphiti
-        print(f"   ✅ Search returned {len(results)} results")
-        if results:
-            print(f"   First result: {results[0]}")
-
-        print("\n" + "="*50)
-        print("✅ ALL TESTS PASSED!")
-        print("="*50)
-        print("\nGraphiti with OpenAI client is working correctly!")
-
-    except Exception as e:
-        print(f"\n❌ ERROR: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        exit(1)
-    finally:
-        await client.close()
-
-if __name__ == "__main__":
-    asyncio.run(test_episode_creation())
+
+    # results is now a list from Graphiti
+    print(f"   ✅ Search returned {len(results)} results")
+    if results:
+        print(f"   First result: {results[0]}")
+    assert isinstance(results, list)
@@ -1,226 +1,206 @@
 """
-Simple test script for Graphiti functionality
-Tests the core functionality without complex async/event loop handling
+Simple tests for Graphiti functionality against the async agent
+
+Run with pytest (see [tool.pytest.ini_options] in pyproject.toml):
+    pytest test_graphiti_simple.py
 """
 
-from src.agent import SyncMemoryAgent
-from src.config import validate_all_configs
-import time
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
+import pytest
 
-def print_section(title: str):
-    """Print a test section header"""
-    print(f"\n{'='*70}")
-    print(f"  {title}")
-    print(f"{'='*70}\n")
+from src.agent import MemoryAgent
+from src.graphiti_client import EpisodeSpec
 
+# Every test talks to Neo4j (and most to OpenAI) - see conftest.py
+pytestmark = pytest.mark.usefixtures("warm_memory_pools")
 
-def test_all():
-    """Run all tests"""
-    print("\n" + "="*70)
-    print("  GRAPHITI AGENT FUNCTIONALITY TEST")
-    print("="*70)
 
-    # Validate configuration
-    try:
-        validate_all_configs()
-        print("\n✅ Configuration validated successfully\n")
-    except Exception as e:
-        print(f"\n❌ Configuration validation failed: {e}\n")
-        return False
-
-    # TEST 1: Initialization
-    print_section("TEST 1: Agent Initialization")
-    try:
-        print("✓ Creating agent for user1...")
-        agent1 = SyncMemoryAgent(user_id="user1")
-        print(f"✓ Agent name: {agent1._async_agent.agent_config.name}")
-        print(f"✓ User ID: {agent1._async_agent.user_id}")
-        print(f"✓ Tools available: {agent1._async_agent.tools.list_tools()}")
-        agent1.close()
-        print("\n✅ TEST 1 PASSED\n")
-    except Exception as e:
-        print(f"\n❌ TEST 1 FAILED: {e}\n")
-        return False
-
-    # TEST 2: Memory Storage & Retrieval
-    print_section("TEST 2: Store & Retrieve Memories")
-    try:
-        print("✓ Creating agent and storing memories...")
-        agent = SyncMemoryAgent(user_id="user2")
-
-        print("  - Storing Python memory...")
-        agent._async_agent.memory.add_episode(
-            name="python_fact",
-            episode_body="User is learning Python. Python is a high-level programming language.",
-            source="test",
-            source_description="Test episode about Python",
-            group_id="user2",
-        )
+def assert_retrieved(context: str) -> None:
+    """Fail on get_context_for_query's error and no-results sentinels
+
+    get_context_for_query never raises, so a broken search or cache path only
+    shows up as one of these strings.
+    """
+    assert context != "Error retrieving memories.", "Retrieval raised; see the logged traceback"
+    assert context != "No relevant memories found.", "Search returned nothing for stored episodes"
 
-        print("  - Storing Java memory...")
-        agent._async_agent.memory.add_episode(
-            name="java_fact",
-            episode_body="User is also learning Java. Java is used for enterprise applications.",
-            source="test",
-            source_description="Test episode about Java",
+
+@asynccontextmanager
+async def open_agent(user_id: str, **agent_kwargs):
+    """Yield an initialized MemoryAgent, closing it and its memory client afterwards"""
+    agent = MemoryAgent(user_id=user_id, **agent_kwargs)
+    await agent.memory_client.initialize()
+    try:
+        yield agent
+    finally:
+        await agent.memory_client.close()
+        agent.close()
+
+
+# Each test's xdist_group is named after the group_ids it writes, so tests
+# sharing a group_id land on the same pytest-xdist worker (--dist=loadgroup)
+@pytest.mark.xdist_group(name="user1")
+async def test_initialization():
+    """TEST 1: Agent Initialization"""
+    print("✓ Creating agent for user1...")
+    async with open_agent("user1") as agent1:
+        print(f"✓ Agent name: {agent1.agent_config.name}")
+        print(f"✓ Tools available: {agent1.tools.list_tools()}")
+
+        assert agent1.user_id == "user1"
+        assert agent1.memory_client._graphiti is not None, "Memory client not initialized"
+        assert "web_search" in agent1.tools.list_tools(), "web_search not registered"
+
+
+@pytest.mark.xdist_group(name="user2")
+async def test_memory_storage_and_retrieval():
+    """TEST 2: Store & Retrieve Memories"""
+    print("✓ Creating agent and storing memories...")
+    async with open_agent("user2") as agent:
+        memory = agent.memory_client
+
+        print("  - Storing Python and Java memories in one bulk call...")
+        await memory.add_episodes_bulk(
+            [
+                EpisodeSpec(
+                    name="python_fact",
+                    episode_body="User is learning Python. Python is a high-level programming language.",
+                    source="test",
+                    source_description="Test episode about Python",
+                ),
+                EpisodeSpec(
+                    name="java_fact",
+                    episode_body="User is also learning Java. Java is used for enterprise applications.",
+                    source="test",
+                    source_description="Test episode about Java",
+                ),
+            ],
             group_id="user2",
         )
 
-        print("\n✓ Retrieving memories for 'programming languages'...")
-        context = agent._async_agent.memory.get_context_for_query(
+        print("✓ Retrieving memories for 'programming languages'...")
+        context = await memory.get_context_for_query(
             query="programming languages",
-            group_id="user2",
+            user_id="user2",
             num_results=5,
         )
 
-        print(f"  Retrieved: {len(context)} characters")
-
-        has_python = "Python" in context
-        has_java = "Java" in context
-
-        if has_python and has_java:
-            print(f"  ✓ Contains Python reference: {has_python}")
-            print(f"  ✓ Contains Java reference: {has_java}")
-            agent.close()
-            print("\n✅ TEST 2 PASSED\n")
-        else:
-            print(f"  ⚠️ Python: {has_python}, Java: {has_java}")
-            print("\n⚠️ TEST 2: Partial success (stored but not retrieved)\n")
-            agent.close()
-
-    except Exception as e:
-        print(f"\n❌ TEST 2 FAILED: {e}\n")
-        import traceback
-        traceback.print_exc()
-        return False
-
-    # TEST 3: User Isolation
-    print_section("TEST 3: User Isolation (group_id)")
-    try:
-        print("✓ Creating agents for user3 and user4...")
-        agent3 = SyncMemoryAgent(user_id="user3")
-        agent4 = SyncMemoryAgent(user_id="user4")
-
-        print("  - Storing user3 preference...")
-        agent3._async_agent.memory.add_episode(
-            name="user3_pref",
-            episode_body="User3 likes Python and JavaScript",
-            source="test",
-            source_description="User3 preferences",
-            group_id="user3",
+    print(f"  Retrieved: {len(context)} characters")
+
+    assert_retrieved(context)
+    # Entity extraction and search ranking are LLM-driven, so a stored fact
+    # can be missed
+    if not ("Python" in context and "Java" in context):
+        pytest.xfail("LLM-dependent retrieval missed a stored fact")
+
+
+@pytest.mark.xdist_group(name="user3-user4")
+async def test_user_isolation():
+    """TEST 3: User Isolation (group_id)"""
+    print("✓ Creating agents for user3 and user4...")
+    async with open_agent("user3") as agent3, open_agent("user4") as agent4:
+        # The users' graphs are independent, so each pair of calls runs concurrently
+        print("  - Storing user3 and user4 preferences...")
+        await asyncio.gather(
+            agent3.memory_client.add_episode(
+                name="user3_pref",
+                episode_body="User3 likes Python and JavaScript",
+                source="test",
+                source_description="User3 preferences",
+                group_id="user3",
+            ),
+            agent4.memory_client.add_episode(
+                name="user4_pref",
+                episode_body="User4 likes Java and C++",
+                source="test",
+                source_description="User4 preferences",
+                group_id="user4",
+            ),
         )
 
-        print("  - Storing user4 preference...")
-        agent4._async_agent.memory.add_episode(
-            name="user4_pref",
-            episode_body="User4 likes Java and C++",
-            source="test",
-            source_description="User4 preferences",
-            group_id="user4",
+        print("✓ Retrieving user3 and user4 memories...")
+        context3, context4 = await asyncio.gather(
+            agent3.memory_client.get_context_for_query(
+                query="preferences",
+                user_id="user3",
+                num_results=5,
+            ),
+            agent4.memory_client.get_context_for_query(
+                query="preferences",
+                user_id="user4",
+                num_results=5,
+            ),
         )
 
-        print("\n✓ Retrieving user3 memories...")
-        context3 = agent3._async_agent.memory.get_context_for_query(
-            query="preferences",
-            group_id="user3",
-            num_results=5,
-        )
+    assert_retrieved(context3)
+    assert_retrieved(context4)
 
-        print("✓ Retrieving user4 memories...")
-        context4 = agent4._async_agent.memory.get_context_for_query(
-            query="preferences",
-            group_id="user4",
-            num_results=5,
-        )
+    # Check isolation
+    user3_ok = "Python" in context3 and "JavaScript" in context3
+    user4_ok = "Java" in context4 and "C++" in context4
+    # Word match, so user3's "JavaScript" doesn't count as user4's "Java"
+    no_mix = (
+        not re.search(r"\b(Python|JavaScript)\b", context4)
+        and not re.search(r"\bJava\b|C\+\+", context3)
+    )
+
+    print(f"  User3 has Python/JavaScript: {user3_ok}")
+    print(f"  User4 has Java/C++: {user4_ok}")
+
+    # group_id filtering is deterministic; recall of each user's own facts is not
+    assert no_mix, "Memories leaked between user3 and user4"
+    if not (user3_ok and user4_ok):
+        pytest.xfail("LLM-dependent retrieval missed a user's own preferences")
 
-        # Check isolation
-        user3_ok = "Python" in context3 and "JavaScript" in context3
-        user4_ok = "Java" in context4 and "C++" in context4
-        no_mix = "Python" not in context4 and "Java" not in context3
-
-        print(f"\n  User3 has Python/JavaScript: {user3_ok}")
-        print(f"  User4 has Java/C++: {user4_ok}")
-        print(f"  No cross-contamination: {no_mix}")
-
-        if user3_ok and user4_ok and no_mix:
-            print("\n✅ TEST 3 PASSED\n")
-            agent3.close()
-            agent4.close()
-        else:
-            print("\n⚠️ TEST 3: Partial isolation\n")
-            agent3.close()
-            agent4.close()
-
-    except Exception as e:
-        print(f"\n❌ TEST 3 FAILED: {e}\n")
-        import traceback
-        traceback.print_exc()
-        return False
-
-    # TEST 4: Tool Configuration
-    print_section("TEST 4: Tool Definitions & Function Calling")
-    try:
-        print("✓ Creating agent...")
-        agent = SyncMemoryAgent(user_id="tool_test")
 
+@pytest.mark.xdist_group(name="tool_test")
+async def test_tool_definitions():
+    """TEST 4: Tool Definitions & Function Calling"""
+    print("✓ Creating agent...")
+    async with open_agent("tool_test") as agent:
         print("✓ Getting tool definitions...")
-        tools = agent._async_agent._get_tool_definitions()
-
-        print(f"  Tools count: {len(tools)}")
-        tool_names = [t['function']['name'] for t in tools]
-        print(f"  Tool names: {tool_names}")
-
-        if 'web_search' in tool_names:
-            print("\n✅ TEST 4 PASSED\n")
-            agent.close()
-        else:
-            print("\n❌ TEST 4 FAILED: web_search not found\n")
-            agent.close()
-            return False
-
-    except Exception as e:
-        print(f"\n❌ TEST 4 FAILED: {e}\n")
-        return False
-
-    # TEST 5: Basic Conversation
-    print_section("TEST 5: Simple Conversation")
-    try:
-        print("✓ Creating agent...")
-        agent = SyncMemoryAgent(user_id="conv_test")
+        tools = agent._get_tool_definitions()
+
+    print(f"  Tools count: {len(tools)}")
+    tool_names = [t['function']['name'] for t in tools]
+    print(f"  Tool names: {tool_names}")
+
+    assert 'web_search' in tool_names, "web_search not found"
 
-        print("✓ Sending simple message (may make LLM call)...")
+
+def _mock_llm_client(content: str) -> AsyncMock:
+    """AsyncOpenAI stand-in whose chat completions always return content, with no tool calls"""
+    message = SimpleNamespace(content=content, tool_calls=None)
+    client = AsyncMock()
+    client.chat.completions.create.return_value = SimpleNamespace(
+        choices=[SimpleNamespace(message=message, finish_reason="stop")]
+    )
+    return client
+
+
+@pytest.mark.xdist_group(name="conv_test")
+async def test_basic_conversation():
+    """TEST 5: Simple Conversation"""
+    expected = "I'm a test agent"
+    llm_client = _mock_llm_client(expected)
+
+    print("✓ Creating agent with a mock LLM client...")
+    async with open_agent("conv_test", llm_client=llm_client) as agent:
+        print("✓ Sending simple message...")
         print("  Message: 'Hi, what can you do?'")
 
-        response = agent.process_message("Hi, what can you do?")
-
-        print(f"\n✓ Response received ({len(response)} chars):")
-        if len(response) > 50:
-            print(f"  {response[:100]}...")
-        else:
-            print(f"  {response}")
-
-        if len(response) > 10:
-            print("\n✅ TEST 5 PASSED\n")
-            agent.close()
-        else:
-            print("\n❌ TEST 5 FAILED: No response\n")
-            agent.close()
-            return False
-
-    except Exception as e:
-        print(f"\n❌ TEST 5 FAILED: {e}\n")
-        import traceback
-        traceback.print_exc()
-        return False
-
-    # Summary
-    print_section("TEST SUMMARY")
-    print("✅ All tests completed successfully!")
-    print("\n🎉 Agent is functioning correctly.\n")
-    return True
-
-
-if __name__ == "__main__":
-    success = test_all()
-    exit(0 if success else 1)
+        # process_message fires the episode store and returns; left real, it
+        # would run after open_agent has closed the memory client
+        with patch.object(agent, "_store_episode_background", AsyncMock()) as store:
+            response = await agent.process_message("Hi, what can you do?")
+
+    print(f"✓ Response received: {response}")
+
+    assert response == expected, f"Expected {expected!r} from the mock LLM"
+    assert llm_client.chat.completions.create.await_count, "Mock LLM was never called"
+    store.assert_called_once_with("Hi, what can you do?", expected)
@@ -0,0 +1,186 @@
+"""Offline tests for the semantic query cache (no Neo4j or OpenAI needed)"""
+
+import math
+
+import msgpack
+import numpy as np
+import pytest
+
+import src.query_cache as query_cache
+from src.query_cache import SemanticQueryCache
+
+DIM = 8
+
+
+def axis(i: int, dim: int = DIM) -> np.ndarray:
+    """Unit vector along axis i"""
+    vec = np.zeros(dim, dtype=np.float32)
+    vec[i] = 1.0
+    return vec
+
+
+def at_similarity(cos: float) -> np.ndarray:
+    """Unit vector with cosine similarity cos to axis(0)"""
+    return cos * axis(0) + math.sqrt(1 - cos * cos) * axis(1)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Empty cache persisted under tmp_path"""
+    return SemanticQueryCache(path=tmp_path / "sem_cache.msgpack", threshold=0.95)
+
+
+def store(cache: SemanticQueryCache, user_id: str, vec, context: str, query=None, num_results=5):
+    """Store context at the user's current generation"""
+    cache.store(user_id, num_results, vec, context, cache.generation(user_id), query)
+
+
+def test_store_then_lookup(cache):
+    store(cache, "alice", axis(0), "alice context", query="what do I like?")
+
+    assert cache.lookup("alice", 5, axis(0)) == "alice context"
+    # Lookups normalize, so the vector's length doesn't matter
+    assert cache.lookup("alice", 5, 3 * axis(0)) == "alice context"
+    assert cache.lookup_exact("alice", 5, "what do I like?") == "alice context"
+    assert cache.lookup_exact("alice", 5, "what do I dislike?") is None
+
+
+def test_partitions_are_per_user_and_num_results(cache):
+    store(cache, "alice", axis(0), "alice context")
+
+    assert cache.lookup("bob", 5, axis(0)) is None
+    assert cache.lookup("alice", 10, axis(0)) is None
+
+
+def test_threshold_separates_hits_from_misses(cache):
+    store(cache, "alice", axis(0), "alice context")
+
+    assert cache.lookup("alice", 5, at_similarity(0.96)) == "alice context"
+    assert cache.lookup("alice", 5, at_similarity(0.94)) is None
+
+
+def test_best_match_wins(cache):
+    store(cache, "alice", axis(0), "near")
+    store(cache, "alice", at_similarity(0.97), "far")
+
+    assert cache.lookup("alice", 5, axis(0)) == "near"
+
+
+def test_dimension_mismatch_misses(cache):
+    store(cache, "alice", axis(0), "alice context")
+
+    assert cache.lookup("alice", 5, axis(0, dim=DIM * 2)) is None
+
+
+def test_expired_entries_miss(cache, monkeypatch):
+    store(cache, "alice", axis(0), "alice context", query="q")
+    later = query_cache.time.time() + cache.ttl_seconds + 1
+    monkeypatch.setattr(query_cache.time, "time", lambda: later)
+
+    assert cache.lookup("alice", 5, axis(0)) is None
+    assert cache.lookup_exact("alice", 5, "q") is None
+
+
+def test_invalidate_drops_only_that_user(cache):
+    store(cache, "alice", axis(0), "alice context", query="q")
+    store(cache, "bob", axis(0), "bob context", query="q")
+
+    cache.invalidate("alice")
+
+    assert cache.lookup("alice", 5, axis(0)) is None
+    assert cache.lookup_exact("alice", 5, "q") is None
+    assert cache.lookup("bob", 5, axis(0)) == "bob context"
+
+
+def test_stale_generation_rejects_store(cache):
+    # A lookup that started before a write must not cache pre-write context
+    generation = cache.generation("alice")
+    cache.invalidate("alice")
+    cache.store("alice", 5, axis(0), "stale context", generation, "q")
+
+    assert cache.lookup("alice", 5, axis(0)) is None
+    assert cache.lookup_exact("alice", 5, "q") is None
+
+    store(cache, "alice", axis(0), "fresh context")
+    assert cache.lookup("alice", 5, axis(0)) == "fresh context"
+
+
+def test_eviction_keeps_newest_entries(tmp_path):
+    cache = SemanticQueryCache(path=tmp_path / "sem_cache.msgpack", max_entries=3)
+    for i in range(4):
+        store(cache, "alice", axis(i), f"context {i}", query=f"q{i}")
+
+    assert cache.lookup("alice", 5, axis(0)) is None
+    assert cache.lookup_exact("alice", 5, "q0") is None
+    for i in range(1, 4):
+        assert cache.lookup("alice", 5, axis(i)) == f"context {i}"
+        assert cache.lookup_exact("alice", 5, f"q{i}") == f"context {i}"
+
+
+def test_growth_and_compaction_keep_rows_aligned(tmp_path):
+    # Well past the initial 16 rows, with enough eviction to trigger compaction
+    max_entries, total = 20, 100
+    cache = SemanticQueryCache(path=tmp_path / "sem_cache.msgpack", max_entries=max_entries)
+    vectors = [np.random.default_rng(i).standard_normal(64) for i in range(total)]
+    for i, vec in enumerate(vectors):
+        store(cache, "alice", vec, f"context {i}")
+
+    partition = cache._partitions[("alice", 5)]
+    assert partition.live == max_entries
+    assert partition.size < 2 * max_entries
+    for i, vec in enumerate(vectors):
+        expected = f"context {i}" if i >= total - max_entries else None
+        assert cache.lookup("alice", 5, vec) == expected
+
+
+def test_save_load_round_trip(cache):
+    rng = np.random.default_rng(0)
+    vectors = [rng.standard_normal(1536) for _ in range(5)]
+    for i, vec in enumerate(vectors):
+        store(cache, "alice", vec, f"context {i}", num_results=3)
+    cache.save()
+
+    loaded = SemanticQueryCache(path=cache.path, threshold=cache.threshold)
+    loaded.load()
+
+    partition = loaded._partitions[("alice", 3)]
+    assert partition.live == len(vectors)
+    for i, (vec, (restored, context, _)) in enumerate(zip(vectors, partition.rows())):
+        unit = vec / np.linalg.norm(vec)
+        # int8 quantization: each component is within half a step of the original
+        assert np.abs(restored - unit).max() <= np.abs(unit).max() / 127
+        assert context == f"context {i}"
+        assert loaded.lookup("alice", 3, vec) == f"context {i}"
+
+
+def test_load_skips_expired_entries(cache, monkeypatch):
+    store(cache, "alice", axis(0), "alice context")
+    cache.save()
+    later = query_cache.time.time() + cache.ttl_seconds + 1
+    monkeypatch.setattr(query_cache.time, "time", lambda: later)
+
+    loaded = SemanticQueryCache(path=cache.path)
+    loaded.load()
+
+    assert loaded._partitions == {}
+
+
+def test_load_reads_bf16_files(cache):
+    vec = at_similarity(0.6).astype(np.float32)
+    bf16 = (vec.view(np.uint32) >> 16).astype(np.uint16).tobytes()
+    stored_at = query_cache.time.time()
+    cache.path.write_bytes(
+        msgpack.packb([["alice", 5, [[bf16, "legacy context", stored_at]]]], use_bin_type=True)
+    )
+
+    cache.load()
+
+    assert cache.lookup("alice", 5, vec) == "legacy context"
+
+
+def test_corrupt_file_loads_cold(cache):
+    cache.path.write_bytes(b"not msgpack")
+
+    cache.load()
+
+    assert cache.lookup("alice", 5, axis(0)) is None